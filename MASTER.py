@@ -1,74 +1,117 @@
 #!/usr/bin/env python3
 
-import os
 import sys
+import importlib
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from colorama import init, Fore, Style
 
 # Initialize colorama
 init()
 
-def run_script(script_path: str, description: str) -> bool:
+# Directory containing the pipeline scripts, resolved once at import
+BASE_DIR = Path(__file__).resolve().parent
+
+def run_script(script_path: Path, description: str) -> bool:
     """Run a Python script and return True if successful."""
     try:
-        result = subprocess.run(
-            [sys.executable, script_path],
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        print(result.stdout)
-        if result.stderr:
-            print(f"{Fore.YELLOW}Warnings:{Style.RESET_ALL}\n{result.stderr}")
+        # Inherit stdio so output streams as it is produced and the
+        # interactive stages can read from the terminal
+        subprocess.run([sys.executable, script_path], check=True)
         print(f"\n{Fore.GREEN}✓ {description} completed successfully{Style.RESET_ALL}")
         return True
     except subprocess.CalledProcessError as e:
-        print(f"{Fore.RED}✗ Error running {description}:{Style.RESET_ALL}")
-        print(e.stderr)
+        print(f"{Fore.RED}✗ Error running {description}: exited with status {e.returncode}{Style.RESET_ALL}")
         return False
     except Exception as e:
         print(f"{Fore.RED}✗ Unexpected error running {description}: {str(e)}{Style.RESET_ALL}")
         return False
 
+def run_stage(module_name: str, callable_name: str, description: str) -> bool:
+    """Import a pipeline stage and run its entry point in-process."""
+    try:
+        module = importlib.import_module(module_name)
+        getattr(module, callable_name)()
+        print(f"\n{Fore.GREEN}✓ {description} completed successfully{Style.RESET_ALL}")
+        return True
+    except SystemExit as e:
+        # Stages report fatal errors through sys.exit()
+        if e.code in (None, 0):
+            print(f"\n{Fore.GREEN}✓ {description} completed successfully{Style.RESET_ALL}")
+            return True
+        print(f"{Fore.RED}✗ {description} exited with status {e.code}{Style.RESET_ALL}")
+        return False
+    except Exception as e:
+        print(f"{Fore.RED}✗ Unexpected error running {description}: {str(e)}{Style.RESET_ALL}")
+        return False
+
+def preload_stage(module_name: str) -> None:
+    """Import a stage module ahead of time so its startup cost is hidden."""
+    try:
+        importlib.import_module(module_name)
+    except Exception:
+        # Import errors are reported when the stage actually runs
+        pass
+
 def main():
     # Print welcome banner
     print("\n╭──────────────────────────────────╮")
     print("│ Code Analysis Pipeline Runner    │")
     print("╰──────────────────────────────────╯")
     
-    # Define script paths
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    scripts = [
+    # Define pipeline stages. Stages run in-process by default; set
+    # "isolated" to run the stage's script in a separate interpreter.
+    stages = [
         {
-            "path": os.path.join(base_dir, "main.py"),
-            "description": "Part 1: File Path Collection"
+            "module": "main",
+            "callable": "main",
+            "path": BASE_DIR / "main.py",
+            "description": "Part 1: File Path Collection",
+            "isolated": False
         },
         {
-            "path": os.path.join(base_dir, "summarize.py"),
-            "description": "Part 2: File Summarization"
+            "module": "src.summarizer.summarizer",
+            "callable": "main",
+            "path": BASE_DIR / "summarize.py",
+            "description": "Part 2: File Summarization",
+            "isolated": False
         },
         {
-            "path": os.path.join(base_dir, "query.py"),
-            "description": "Part 3: Interactive Query Interface"
+            "module": "src.rag.query_interface",
+            "callable": "main",
+            "path": BASE_DIR / "query.py",
+            "description": "Part 3: Interactive Query Interface",
+            "isolated": False
         }
     ]
     
-    # Run each script in sequence
-    for script in scripts:
-        print(f"\n{Fore.YELLOW}Starting {script['description']}{Style.RESET_ALL}")
+    # Run each stage in sequence, importing the next in-process stage in the
+    # background while the current one runs
+    preloader = ThreadPoolExecutor(max_workers=1)
+    for i, stage in enumerate(stages):
+        print(f"\n{Fore.YELLOW}Starting {stage['description']}{Style.RESET_ALL}")
         print("=" * 50)
         
-        if not os.path.exists(script["path"]):
-            print(f"{Fore.RED}✗ Script not found: {script['path']}{Style.RESET_ALL}")
-            break
-            
-        success = run_script(script["path"], script["description"])
+        next_stage = stages[i + 1] if i + 1 < len(stages) else None
+        if next_stage and not next_stage["isolated"]:
+            preloader.submit(preload_stage, next_stage["module"])
+        
+        if stage["isolated"]:
+            if not stage["path"].exists():
+                print(f"{Fore.RED}✗ Script not found: {stage['path']}{Style.RESET_ALL}")
+                break
+            success = run_script(stage["path"], stage["description"])
+        else:
+            success = run_stage(stage["module"], stage["callable"], stage["description"])
+        
         if not success:
-            print(f"\n{Fore.RED}Pipeline stopped due to error in {script['description']}{Style.RESET_ALL}")
+            print(f"\n{Fore.RED}Pipeline stopped due to error in {stage['description']}{Style.RESET_ALL}")
             break
-            
+        
         print("=" * 50)
     
+    preloader.shutdown(wait=False)
     print("\nPipeline execution completed.")
 
 if __name__ == "__main__":
@@ -7,9 +7,6 @@ import os
 import sys
 import time
 
-# Initialize colorama
-init()
-
 def print_banner():
     """Print a welcome banner for the tool."""
     banner = """
@@ -61,4 +58,6 @@ def main():
         sys.exit(1)
 
 if __name__ == "__main__":
+    # Initialize colorama
+    init()
     main() 
\ No newline at end of file
@@ -4,9 +4,19 @@ import ast
 import re
 from typing import Dict, List, Optional, Tuple
 
+# Patterns compiled once at import rather than looked up per line/file
+COMMENT_RE = re.compile(r'^\s*(#|//|/\*|\*|<!--)')
+CREDENTIALS_RE = re.compile(r'(password|secret|key)\s*=\s*["\'][^"\']+["\']', re.I)
+TODO_RE = re.compile(r'(TODO|FIXME|XXX|HACK):')
+CONTROL_RE = re.compile(r'\b(if|for|while|switch)\b')
+
+# AST node types that each add one to a file's complexity
+BRANCH_NODES = frozenset({ast.If, ast.While, ast.For})
+
 class CodeAnalyzer:
     def __init__(self):
         self.issues = []
+        self.long_lines = []
         self.stats = {
             'complexity': 0,
             'nesting_depth': 0,
@@ -46,93 +56,105 @@ class CodeAnalyzer:
         }
 
     def _analyze_basic_metrics(self, content: str):
-        """Analyze basic code metrics."""
-        lines = content.split('\n')
-        self.stats['lines_of_code'] = len(lines)
-        
-        # Count comment lines
-        comment_pattern = r'^\s*(#|//|/\*|\*|<!--)'
-        self.stats['comment_lines'] = sum(1 for line in lines if re.match(comment_pattern, line))
+        """Analyze basic code metrics in a single pass over the lines.
         
-        # Calculate nesting depth
+        Long lines are collected in the same pass for _analyze_patterns.
+        """
+        line_count = 0
+        comment_lines = 0
         max_indent = 0
-        for line in lines:
+        long_lines = []
+        comment_match = COMMENT_RE.match
+        
+        for line_count, line in enumerate(content.split('\n'), 1):
+            # Count comment lines
+            if comment_match(line):
+                comment_lines += 1
+            
+            # Calculate nesting depth
             indent = len(line) - len(line.lstrip())
-            max_indent = max(max_indent, indent)
+            if indent > max_indent:
+                max_indent = indent
+            
+            if len(line) > 100:
+                long_lines.append(line_count)
+        
+        self.stats['lines_of_code'] = line_count
+        self.stats['comment_lines'] = comment_lines
         self.stats['nesting_depth'] = max_indent // 4  # Assuming 4 spaces per indent level
+        self.long_lines = long_lines
 
     def _analyze_ast(self, tree: ast.AST):
-        """Analyze Python AST for potential issues."""
-        class ASTAnalyzer(ast.NodeVisitor):
-            def __init__(self, analyzer):
-                self.analyzer = analyzer
-                self.current_complexity = 0
+        """Analyze Python AST for potential issues.
+        
+        Nodes are visited depth-first in source order with an explicit stack,
+        so issues are reported in the same order as a NodeVisitor would.
+        """
+        issues = self.issues
+        function_count = 0
+        class_count = 0
+        complexity = 0
+        
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            node_type = type(node)
+            
+            if node_type in BRANCH_NODES:
+                complexity += 1
                 
-            def visit_FunctionDef(self, node):
-                self.analyzer.stats['function_count'] += 1
+            elif node_type is ast.FunctionDef:
+                function_count += 1
                 
                 # Check function complexity
                 if len(node.body) > 20:
-                    self.analyzer.issues.append(
+                    issues.append(
                         f"Function '{node.name}' is too long ({len(node.body)} lines)"
                     )
                 
                 # Check number of arguments
                 if len(node.args.args) > 5:
-                    self.analyzer.issues.append(
+                    issues.append(
                         f"Function '{node.name}' has too many parameters ({len(node.args.args)})"
                     )
-                
-                self.generic_visit(node)
-                
-            def visit_ClassDef(self, node):
-                self.analyzer.stats['class_count'] += 1
+            
+            elif node_type is ast.ClassDef:
+                class_count += 1
                 
                 # Check class complexity
                 if len(node.body) > 30:
-                    self.analyzer.issues.append(
+                    issues.append(
                         f"Class '{node.name}' might be too complex ({len(node.body)} members)"
                     )
-                
-                self.generic_visit(node)
-                
-            def visit_If(self, node):
-                self.current_complexity += 1
-                self.generic_visit(node)
-                
-            def visit_While(self, node):
-                self.current_complexity += 1
-                self.generic_visit(node)
-                
-            def visit_For(self, node):
-                self.current_complexity += 1
-                self.generic_visit(node)
-                
-            def visit_Try(self, node):
+            
+            elif node_type is ast.Try:
                 if len(node.handlers) > 2:
-                    self.analyzer.issues.append(
+                    issues.append(
                         "Try block has too many except clauses"
                     )
-                self.generic_visit(node)
+            
+            # Push children reversed so the first child is visited next
+            children = list(ast.iter_child_nodes(node))
+            children.reverse()
+            stack.extend(children)
         
-        analyzer = ASTAnalyzer(self)
-        analyzer.visit(tree)
-        self.stats['complexity'] = analyzer.current_complexity
+        self.stats['function_count'] += function_count
+        self.stats['class_count'] += class_count
+        self.stats['complexity'] = complexity
 
     def _analyze_patterns(self, content: str):
         """Analyze code using pattern matching for non-Python files."""
         # Check for hardcoded values
-        if re.search(r'(password|secret|key)\s*=\s*["\'][^"\']+["\']', content, re.I):
+        if CREDENTIALS_RE.search(content):
             self.issues.append("Possible hardcoded credentials detected")
             
         # Check for TODO comments
-        if re.search(r'(TODO|FIXME|XXX|HACK):', content):
+        if TODO_RE.search(content):
             self.issues.append("Contains TODO/FIXME comments that need attention")
             
-        # Check for long lines
-        long_lines = [i+1 for i, line in enumerate(content.split('\n')) if len(line) > 100]
-        if long_lines:
-            self.issues.append(f"Lines {', '.join(map(str, long_lines))} exceed recommended length")
+        # Check for long lines (found by _analyze_basic_metrics)
+        if self.long_lines:
+            self.issues.append(f"Lines {', '.join(map(str, self.long_lines))} exceed recommended length")
             
         # Check for nested callbacks (JavaScript/TypeScript)
         if content.count('=>') > 3:
@@ -141,5 +163,5 @@ class CodeAnalyzer:
                 self.issues.append(f"High number of nested callbacks/promises ({nested_callbacks})")
                 
         # Estimate complexity based on control structures
-        control_structures = len(re.findall(r'\b(if|for|while|switch)\b', content))
+        control_structures = len(CONTROL_RE.findall(content))
         self.stats['complexity'] = control_structures 
\ No newline at end of file
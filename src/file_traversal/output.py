@@ -3,10 +3,16 @@
 import os
 import json
 from datetime import datetime
+from operator import itemgetter
 from typing import Dict, List
 from rich.console import Console
 from rich.table import Table
 
+try:
+    import orjson  # Optional: faster JSON serialization
+except ImportError:
+    orjson = None
+
 console = Console()
 
 def write_to_file(traversal_results: Dict) -> str:
@@ -32,62 +38,77 @@ def write_to_file(traversal_results: Dict) -> str:
     stats = traversal_results['stats']
     analysis = traversal_results['analysis']
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        # Write header
-        f.write("=== File Path Analysis Report ===\n")
-        f.write(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-        
-        # Write statistics
-        f.write("=== Statistics ===\n")
-        f.write(f"Total Files: {stats['total_files']}\n")
-        f.write(f"Total Directories: {stats['total_dirs']}\n")
-        f.write(f"Deepest Nesting Level: {stats['deepest_nesting']}\n\n")
-        
-        # Write file type distribution
-        f.write("=== File Type Distribution ===\n")
-        for ext, count in stats['file_types'].items():
-            f.write(f"{ext}: {count} files\n")
-        f.write("\n")
-        
-        # Write largest files
-        f.write("=== Largest Files ===\n")
-        for path, size in stats['largest_files']:
-            size_mb = size / (1024 * 1024)
-            f.write(f"{path}: {size_mb:.2f} MB\n")
-        f.write("\n")
+    # Build the report in memory and write it with a single call
+    parts = []
+    w = parts.append
+    
+    # Write header
+    w("=== File Path Analysis Report ===\n")
+    w(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
+    
+    # Write statistics
+    w("=== Statistics ===\n")
+    w(f"Total Files: {stats['total_files']}\n")
+    w(f"Total Directories: {stats['total_dirs']}\n")
+    w(f"Deepest Nesting Level: {stats['deepest_nesting']}\n\n")
+    
+    # Write file type distribution
+    w("=== File Type Distribution ===\n")
+    for ext, count in stats['file_types'].items():
+        w(f"{ext}: {count} files\n")
+    w("\n")
+    
+    # Write largest files
+    w("=== Largest Files ===\n")
+    for path, size in stats['largest_files']:
+        size_mb = size / (1024 * 1024)
+        w(f"{path}: {size_mb:.2f} MB\n")
+    w("\n")
+    
+    # Write detailed file listing with analysis
+    separator = "\n" + "-"*50 + "\n"
+    w("=== Detailed File Analysis ===\n")
+    paths.sort(key=itemgetter('path'))
+    for file_info in paths:
+        path = file_info['path']
+        w(
+            f"\nFile: {path}\n"
+            f"Size: {file_info['size']} bytes\n"
+            f"Type: {file_info['type']}\n"
+            f"Nesting Level: {file_info['nesting_level']}\n"
+        )
         
-        # Write detailed file listing with analysis
-        f.write("=== Detailed File Analysis ===\n")
-        for file_info in sorted(paths, key=lambda x: x['path']):
-            path = file_info['path']
-            f.write(f"\nFile: {path}\n")
-            f.write(f"Size: {file_info['size']} bytes\n")
-            f.write(f"Type: {file_info['type']}\n")
-            f.write(f"Nesting Level: {file_info['nesting_level']}\n")
+        # Include code analysis if available
+        file_analysis = analysis.get(path)
+        if file_analysis is not None:
+            w("\nCode Analysis:\n")
             
-            # Include code analysis if available
-            if path in analysis:
-                f.write("\nCode Analysis:\n")
-                
-                # Write code statistics
-                stats = analysis[path]['stats']
-                if stats:
-                    f.write("  Statistics:\n")
-                    f.write(f"  - Complexity: {stats.get('complexity', 'N/A')}\n")
-                    f.write(f"  - Functions: {stats.get('function_count', 'N/A')}\n")
-                    f.write(f"  - Classes: {stats.get('class_count', 'N/A')}\n")
-                    f.write(f"  - Lines of Code: {stats.get('lines_of_code', 'N/A')}\n")
-                    f.write(f"  - Comment Lines: {stats.get('comment_lines', 'N/A')}\n")
-                    f.write(f"  - Nesting Depth: {stats.get('nesting_depth', 'N/A')}\n")
-                
-                # Write potential issues
-                issues = analysis[path]['issues']
-                if issues:
-                    f.write("\n  Potential Issues:\n")
-                    for issue in issues:
-                        f.write(f"  - {issue}\n")
+            # Write code statistics
+            code_stats = file_analysis['stats']
+            if code_stats:
+                w(
+                    "  Statistics:\n"
+                    f"  - Complexity: {code_stats.get('complexity', 'N/A')}\n"
+                    f"  - Functions: {code_stats.get('function_count', 'N/A')}\n"
+                    f"  - Classes: {code_stats.get('class_count', 'N/A')}\n"
+                    f"  - Lines of Code: {code_stats.get('lines_of_code', 'N/A')}\n"
+                    f"  - Comment Lines: {code_stats.get('comment_lines', 'N/A')}\n"
+                    f"  - Nesting Depth: {code_stats.get('nesting_depth', 'N/A')}\n"
+                )
             
-            f.write("\n" + "-"*50 + "\n")
+            # Write potential issues
+            issues = file_analysis['issues']
+            if issues:
+                w("\n  Potential Issues:\n")
+                for issue in issues:
+                    w(f"  - {issue}\n")
+        
+        w(separator)
+    
+    # Encode the whole report once; surrogateescape writes undecodable file
+    # names back out as their original bytes instead of raising
+    with open(output_file, 'wb') as f:
+        f.write("".join(parts).encode('utf-8', 'surrogateescape'))
     
     # Create a summary table for display
     table = Table(title="Analysis Summary")
@@ -117,7 +138,11 @@ def write_to_file(traversal_results: Dict) -> str:
     }
     
     metadata_file = os.path.join(output_dir, f"metadata_{timestamp}.json")
-    with open(metadata_file, 'w', encoding='utf-8') as f:
-        json.dump(metadata, f, indent=2)
+    if orjson is not None:
+        with open(metadata_file, 'wb') as f:
+            f.write(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
+    else:
+        with open(metadata_file, 'w', encoding='utf-8') as f:
+            json.dump(metadata, f, indent=2)
     
     return output_file 
\ No newline at end of file
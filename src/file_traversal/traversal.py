@@ -1,9 +1,81 @@
 """File traversal module for collecting and analyzing file paths."""
 
 import os
-from typing import Dict, List, Set
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Generator, List, Set, Tuple
 from .analyzer import CodeAnalyzer
 
+PARALLEL_ANALYSIS_MIN_FILES = 32  # Below this, worker process startup outweighs the gain
+CODE_EXTENSIONS = frozenset({'.py', '.js', '.ts', '.tsx', '.jsx', '.cpp', '.c', '.h', '.java'})  # Files analyzed for code issues
+MAX_ANALYSIS_SIZE = int(os.getenv("MAX_ANALYSIS_SIZE_KB", "512")) * 1024  # Larger files (bundles, generated code) are not analyzed
+SKIP_DIRS = frozenset(
+    name.strip() for name in os.getenv("TRAVERSAL_SKIP_DIRS", "__pycache__,node_modules,venv").split(",")
+    if name.strip()
+)  # Directory names never descended into, besides hidden ones
+
+def _analyze_one(file_path: str) -> Dict:
+    """Read and analyze a single code file; runs in a worker process."""
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+            if '\0' in content:
+                return {
+                    'issues': ["Binary file, skipped analysis"],
+                    'stats': {}
+                }
+            issues, code_stats = CodeAnalyzer().analyze_file(file_path, content)
+            return {
+                'issues': issues,
+                'stats': code_stats
+            }
+    except Exception as e:
+        return {
+            'issues': [f"Error analyzing file: {str(e)}"],
+            'stats': {}
+        }
+
+def _walk(top: str, rel_dir: str = "",
+          depth: int = 0) -> Generator[Tuple[str, str, int, List[os.DirEntry]], None, None]:
+    """
+    Walk a directory tree top-down with os.scandir, like os.walk.
+    
+    Unlike os.walk, the files are yielded as DirEntry objects so their
+    cached stat results can be reused. Hidden directories and those named
+    in SKIP_DIRS are pruned without being read. Symlinked directories are
+    not followed and unreadable directories are skipped.
+    
+    Yields:
+        Tuples of (directory path, path relative to the root, nesting level,
+        file entries)
+    """
+    try:
+        with os.scandir(top) as it:
+            entries = list(it)
+    except OSError:
+        return
+    
+    files = []
+    subdirs = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if not is_dir:
+            files.append(entry)
+        elif not (entry.name.startswith('.') or entry.name in SKIP_DIRS or entry.is_symlink()):
+            subdirs.append(entry)
+    
+    yield top, rel_dir, depth, files
+    
+    for entry in subdirs:
+        yield from _walk(
+            entry.path,
+            os.path.join(rel_dir, entry.name) if rel_dir else entry.name,
+            depth + 1
+        )
+
 def get_file_paths(root_path: str) -> Dict:
     """
     Traverse a directory and collect file information with analysis.
@@ -27,78 +99,83 @@ def get_file_paths(root_path: str) -> Dict:
     }
     analysis_results = {}
     
-    # Initialize analyzer
-    analyzer = CodeAnalyzer()
+    # Code files to analyze once the walk is done, as (relative, full) paths
+    code_files = []
     
     # Track unique directories
     unique_dirs = set()
     
     # Helper function to update file type stats
-    def update_file_type_stats(file_path: str):
-        ext = os.path.splitext(file_path)[1].lower()
+    def update_file_type_stats(ext: str):
         if ext:
             stats['file_types'][ext] = stats['file_types'].get(ext, 0) + 1
         else:
             stats['file_types']['no_extension'] = stats['file_types'].get('no_extension', 0) + 1
     
-    # Helper function to track large files
-    def track_large_file(file_path: str, size: int):
-        stats['largest_files'].append((file_path, size))
-        stats['largest_files'].sort(key=lambda x: x[1], reverse=True)
-        stats['largest_files'] = stats['largest_files'][:5]  # Keep top 5
-    
-    for root, dirs, files in os.walk(root_path):
+    for root, rel_dir, nesting_level, files in _walk(root_path):
         # Update directory stats
-        rel_path = os.path.relpath(root, root_path)
-        nesting_level = len(rel_path.split(os.sep)) if rel_path != '.' else 0
         stats['deepest_nesting'] = max(stats['deepest_nesting'], nesting_level)
         
         # Add to unique directories
         unique_dirs.add(root)
         
-        for file in files:
-            file_path = os.path.join(root, file)
-            rel_file_path = os.path.relpath(file_path, root_path)
+        for entry in files:
+            file = entry.name
+            file_path = entry.path
+            rel_file_path = os.path.join(rel_dir, file) if rel_dir else file
             
-            # Skip certain files and directories
-            if any(part.startswith('.') for part in rel_file_path.split(os.sep)):
+            # Skip hidden files
+            if file.startswith('.'):
                 continue
                 
-            # Get file info
+            # Get file info from the stat cached on the directory entry
             try:
-                file_size = os.path.getsize(file_path)
+                file_size = entry.stat().st_size
+                ext = os.path.splitext(file)[1].lower()
                 file_info = {
                     'path': rel_file_path,
                     'size': file_size,
-                    'type': os.path.splitext(file)[1].lower(),
+                    'type': ext,
                     'nesting_level': nesting_level
                 }
                 
-                # Analyze file content for code files
-                if os.path.splitext(file)[1].lower() in ['.py', '.js', '.ts', '.tsx', '.jsx', '.cpp', '.c', '.h', '.java']:
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            issues, code_stats = analyzer.analyze_file(file_path, content)
-                            analysis_results[rel_file_path] = {
-                                'issues': issues,
-                                'stats': code_stats
-                            }
-                    except Exception as e:
+                # Queue code files for content analysis
+                if ext in CODE_EXTENSIONS:
+                    if file_size > MAX_ANALYSIS_SIZE:
                         analysis_results[rel_file_path] = {
-                            'issues': [f"Error analyzing file: {str(e)}"],
+                            'issues': [f"File too large to analyze ({file_size // 1024} KB), skipped"],
                             'stats': {}
                         }
+                    else:
+                        code_files.append((rel_file_path, file_path))
                 
                 paths.append(file_info)
-                update_file_type_stats(file)
-                track_large_file(rel_file_path, file_size)
+                update_file_type_stats(ext)
                 
             except Exception as e:
                 print(f"Error processing {file_path}: {str(e)}")
                 continue
     
+    # Analyze code files, in parallel worker processes when there are enough
+    # of them; parsing and pattern matching are CPU-bound
+    file_paths = [file_path for _, file_path in code_files]
+    if len(code_files) >= PARALLEL_ANALYSIS_MIN_FILES:
+        workers = os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(
+                _analyze_one, file_paths,
+                chunksize=max(1, len(file_paths) // (workers * 4))
+            ))
+    else:
+        results = [_analyze_one(file_path) for file_path in file_paths]
+    for (rel_file_path, _), result in zip(code_files, results):
+        analysis_results[rel_file_path] = result
+    
     # Update final stats
+    stats['largest_files'] = [
+        (file_info['path'], file_info['size'])
+        for file_info in heapq.nlargest(5, paths, key=lambda x: x['size'])  # Keep top 5
+    ]
     stats['total_files'] = len(paths)
     stats['total_dirs'] = len(unique_dirs)
     
@@ -1,20 +1,36 @@
 """Knowledge base for the RAG system with optimized performance."""
 
 import os
+
+# FAISS search threads; capped since searches are small and the extra cores
+# mostly add fork/join overhead
+FAISS_THREADS = int(os.getenv("FAISS_THREADS", str(min(8, os.cpu_count() or 1))))
+
+# OpenMP reads these when faiss and numpy first load it, so they are set
+# before those imports. Passive waiting stops idle threads spinning between
+# searches.
+os.environ.setdefault("OMP_WAIT_POLICY", "PASSIVE")
+os.environ.setdefault("OMP_NUM_THREADS", str(FAISS_THREADS))
+
 import json
+import time
+import hashlib
 import faiss
 import numpy as np
 import tiktoken
-from typing import List, Dict, Tuple, Optional, Generator
+from typing import List, Dict, Tuple, Optional, Generator, Callable
 from pathlib import Path
+from collections import OrderedDict, deque
 import threading
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+import httpx
 import openai
 from halo import Halo
 from colorama import Fore, Style
 import pickle
 import shutil
+import mmap
 
 # Load environment variables
 load_dotenv()
@@ -22,131 +38,577 @@ load_dotenv()
 # Constants
 BATCH_SIZE = 10  # Number of files to process at once
 MAX_CACHE_SIZE = 1000  # Maximum number of embeddings to cache
-MAX_RETRIES = 3  # Maximum number of API call retries
+STORAGE_DTYPE = np.float16  # Precision of cached and saved embeddings
+MAX_RETRIES = 5  # Maximum number of API call attempts
+RETRY_BASE_DELAY = 1.0  # Seconds before the first retry, doubled after each one
 EMBEDDING_DIMENSION = 1536  # Dimension of OpenAI embeddings
-MAX_WORKERS = 4  # Maximum number of parallel workers
+MAX_EMBEDDING_TOKENS = 8191  # Maximum tokens the embedding model accepts per input
+EMBEDDING_BATCH_TOKENS = 7500  # Token budget for the inputs of one embeddings request
+EMBEDDING_BATCH_ITEMS = 256  # Maximum inputs sent in one embeddings request
+READ_WORKERS = 16  # Threads reading summary files ahead of embedding
+READ_AHEAD = READ_WORKERS * 2  # Summary files read but not yet consumed, at most
+EMBEDDING_WORKERS = 5  # Embeddings requests in flight at once while initializing
+EMBEDDING_AHEAD = EMBEDDING_WORKERS * 2  # Embedding batches queued before waiting on the oldest
+HNSW_MIN_VECTORS = int(os.getenv("HNSW_MIN_VECTORS", "1000"))  # Summaries needed before switching from exact search to HNSW
+HNSW_M = 32  # Graph neighbors per HNSW node
+HNSW_EF_CONSTRUCTION = 40  # HNSW candidate list size while building
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "16"))  # HNSW candidate list size per query
+IVF_MIN_VECTORS = int(os.getenv("IVF_MIN_VECTORS", "10000"))  # Summaries needed before switching from HNSW to IVF
+IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))  # IVF partitions scanned per query
+KB_USE_GPU = os.getenv("KB_USE_GPU", "").lower() in ("1", "true", "yes")  # Copy the index to a GPU for batched searches
+RESPONSE_CACHE_SIZE = 256  # Maximum number of cached AI responses
+RESPONSE_CACHE_TTL = 3600  # Seconds before a cached AI response expires
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.98"))  # Cosine similarity for reusing a response; ada-002 scores sit in a narrow high band
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))  # Maximum summary tokens sent per query
+
+# Shared HTTP/2 connection pool so embedding and chat requests reuse
+# established TLS connections instead of reconnecting per request
+http_client = httpx.Client(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=60),
+    timeout=httpx.Timeout(30.0, connect=5.0)
+)
+
+# BPE tables are loaded once per process and shared by every instance
+tokenizer = tiktoken.get_encoding("cl100k_base")
+
+def _replace_npy(path: Path, array: np.ndarray) -> None:
+    """Save an array by replacing rather than overwriting the file.
+    
+    A memory map of the previous file stays valid after the replace.
+    """
+    tmp_path = path.with_name(path.stem + '.tmp.npy')
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+class DocumentStore:
+    """Summary documents stored column by column.
+    
+    Summary texts are saved as one UTF-8 blob indexed by an offsets array. A
+    loaded store memory maps the blob, so only the summaries actually used as
+    context are read from disk.
+    """
+    
+    def __init__(self):
+        self.sources: List[str] = []
+        self.created_at: List[float] = []
+        self.token_counts: List[int] = []
+        self._summaries: List[str] = []
+        self._blob = None
+        self._offsets = None
+    
+    def __len__(self) -> int:
+        return len(self.sources)
+    
+    def append(self, source: str, created_at: float, summary: str, token_count: int) -> None:
+        """Add a document to a store that is being built."""
+        self.sources.append(source)
+        self.created_at.append(created_at)
+        self.token_counts.append(token_count)
+        self._summaries.append(summary)
+    
+    def summary(self, i: int) -> str:
+        """Return the summary text of document i."""
+        if self._blob is None:
+            return self._summaries[i]
+        return self._blob[self._offsets[i]:self._offsets[i + 1]].decode('utf-8')
+    
+    def save(self, state_dir: Path) -> None:
+        """Save the columns, summary blob and offsets into state_dir."""
+        encoded = [self.summary(i).encode('utf-8') for i in range(len(self))]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+        
+        # Replace rather than overwrite so a mapped previous blob stays valid
+        tmp_path = state_dir / 'summaries.tmp.bin'
+        with open(tmp_path, 'wb') as f:
+            f.write(b"".join(encoded))
+        os.replace(tmp_path, state_dir / 'summaries.bin')
+        _replace_npy(state_dir / 'summary_offsets.npy', offsets)
+        
+        with open(state_dir / 'documents.pkl', 'wb') as f:
+            pickle.dump({
+                'sources': self.sources,
+                'created_at': self.created_at,
+                'token_counts': self.token_counts
+            }, f, protocol=5)
+    
+    @classmethod
+    def load(cls, state_dir: Path) -> "DocumentStore":
+        """Load a saved store, memory mapping its summary blob."""
+        with open(state_dir / 'documents.pkl', 'rb') as f:
+            columns = pickle.load(f)
+        offsets = np.load(state_dir / 'summary_offsets.npy')
+        if len(offsets) != len(columns['sources']) + 1:
+            raise ValueError("Document columns and summary offsets do not match")
+        
+        store = cls()
+        store.sources = columns['sources']
+        store.created_at = columns['created_at']
+        store.token_counts = columns['token_counts']
+        store._offsets = offsets
+        with open(state_dir / 'summaries.bin', 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                store._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                store._blob = b""
+        return store
+    
+    def clear(self) -> None:
+        """Drop every document and unmap the summary blob."""
+        if isinstance(self._blob, mmap.mmap):
+            self._blob.close()
+        self.sources = []
+        self.created_at = []
+        self.token_counts = []
+        self._summaries = []
+        self._blob = None
+        self._offsets = None
 
 class KnowledgeBase:
     def __init__(self, model: str = "gpt-3.5-turbo"):
         """Initialize the knowledge base with performance optimizations."""
+        faiss.omp_set_num_threads(FAISS_THREADS)
         self.model = model
-        self.client = openai.OpenAI()
+        self.client = openai.OpenAI(http_client=http_client)
         self.index = None
-        self.documents = []
-        self.embeddings_cache = {}
+        self.search_matrix = None
+        self.gpu_index = None
+        self.gpu_resources = None
+        self.documents = DocumentStore()
+        self.embeddings_cache = OrderedDict()
         self.cache_lock = threading.Lock()
         self.embedding_model = "text-embedding-ada-002"
-        self.tokenizer = tiktoken.get_encoding("cl100k_base")
+        self.tokenizer = tokenizer
+        self.response_cache = OrderedDict()
+        self.semantic_cache = OrderedDict()
+        self.response_lock = threading.Lock()
+        self.prefetch_executor = ThreadPoolExecutor(max_workers=1)
+        self.pending_embeddings = {}
         
     def _batch_generator(self, items: List, batch_size: int) -> Generator[List, None, None]:
         """Generate batches of items for processing."""
         for i in range(0, len(items), batch_size):
             yield items[i:i + batch_size]
+    
+    def _read_ahead(self, reader: ThreadPoolExecutor, paths: List[str]) -> Generator[str, None, None]:
+        """Yield file contents in order, with at most READ_AHEAD reads outstanding."""
+        remaining = iter(paths)
+        window = deque()
+        for path in remaining:
+            window.append(reader.submit(Path(path).read_text, encoding='utf-8'))
+            if len(window) >= READ_AHEAD:
+                break
+        while window:
+            content = window.popleft().result()
+            path = next(remaining, None)
+            if path is not None:
+                window.append(reader.submit(Path(path).read_text, encoding='utf-8'))
+            yield content
             
     def _manage_cache_size(self) -> None:
-        """Ensure cache doesn't exceed maximum size."""
-        with self.cache_lock:
-            if len(self.embeddings_cache) > MAX_CACHE_SIZE:
-                # Remove oldest 20% of cache entries
-                num_to_remove = int(MAX_CACHE_SIZE * 0.2)
-                for _ in range(num_to_remove):
-                    self.embeddings_cache.popitem()
+        """Evict least recently used embeddings over MAX_CACHE_SIZE. Caller holds cache_lock."""
+        while len(self.embeddings_cache) > MAX_CACHE_SIZE:
+            self.embeddings_cache.popitem(last=False)
                     
+    def _get_cached_response(self, cache_key: str) -> Optional[str]:
+        """Return an unexpired cached response for an exact query/context match."""
+        with self.response_lock:
+            entry = self.response_cache.get(cache_key)
+            if entry is None:
+                return None
+            timestamp, response = entry
+            if time.time() - timestamp > RESPONSE_CACHE_TTL:
+                del self.response_cache[cache_key]
+                return None
+            self.response_cache.move_to_end(cache_key)
+            return response
+    
+    def _cache_response(self, cache_key: str, response: str) -> None:
+        """Store a response in the exact-match cache with LRU eviction."""
+        with self.response_lock:
+            self.response_cache[cache_key] = (time.time(), response)
+            self.response_cache.move_to_end(cache_key)
+            while len(self.response_cache) > RESPONSE_CACHE_SIZE:
+                self.response_cache.popitem(last=False)
+    
+    def _find_similar_response(self, query_embedding: np.ndarray, doc_ids: Tuple[int, ...]) -> Optional[str]:
+        """Return a cached response for a semantically equivalent earlier query.
+        
+        Only queries that retrieved the same documents are considered, so
+        similar questions about different code never share an answer.
+        """
+        with self.response_lock:
+            now = time.time()
+            expired = [q for q, (timestamp, _, _, _) in self.semantic_cache.items()
+                       if now - timestamp > RESPONSE_CACHE_TTL]
+            for q in expired:
+                del self.semantic_cache[q]
+            
+            queries = [q for q, entry in self.semantic_cache.items() if entry[2] == doc_ids]
+            if not queries:
+                return None
+            
+            embeddings = np.stack([self.semantic_cache[q][1] for q in queries])
+            scores = embeddings @ (query_embedding / np.linalg.norm(query_embedding))
+            best = int(np.argmax(scores))
+            if scores[best] < SEMANTIC_CACHE_THRESHOLD:
+                return None
+            self.semantic_cache.move_to_end(queries[best])
+            return self.semantic_cache[queries[best]][3]
+    
+    def _cache_similar_response(self, query: str, query_embedding: np.ndarray,
+                                doc_ids: Tuple[int, ...], response: str) -> None:
+        """Store a response in the semantic cache keyed by its query embedding and retrieved documents."""
+        with self.response_lock:
+            unit_embedding = query_embedding / np.linalg.norm(query_embedding)
+            self.semantic_cache[query] = (time.time(), unit_embedding, doc_ids, response)
+            self.semantic_cache.move_to_end(query)
+            while len(self.semantic_cache) > RESPONSE_CACHE_SIZE:
+                self.semantic_cache.popitem(last=False)
+    
     def _api_call_with_retry(self, func, *args, **kwargs) -> Dict:
-        """Make API calls with retry logic."""
+        """Make API calls with retry logic.
+        
+        Only transient failures (rate limits, timeouts, connection and server
+        errors) are retried, with exponential backoff. A rate limit's
+        Retry-After header is honored when present. Other errors, such as
+        authentication failures, are raised immediately.
+        """
+        delay = RETRY_BASE_DELAY
         for attempt in range(MAX_RETRIES):
             try:
                 return func(*args, **kwargs)
-            except Exception as e:
+            except (openai.RateLimitError, openai.APIConnectionError,
+                    openai.InternalServerError) as e:
                 if attempt == MAX_RETRIES - 1:
                     raise
-                print(f"{Fore.YELLOW}Retry {attempt + 1}/{MAX_RETRIES}: {str(e)}{Style.RESET_ALL}")
+                wait = delay
+                response = getattr(e, 'response', None)
+                if response is not None:
+                    try:
+                        wait = float(response.headers.get('retry-after', delay))
+                    except ValueError:
+                        pass
+                print(f"{Fore.YELLOW}Retry {attempt + 1}/{MAX_RETRIES - 1} in {wait:.0f}s: {str(e)}{Style.RESET_ALL}")
+                time.sleep(wait)
+                delay *= 2
                 
+    @staticmethod
+    def _embedding_key(text: str) -> int:
+        """Return a stable 64-bit cache key for text.
+        
+        Unlike hash(), this is the same in every process, so the saved cache
+        stays valid across runs. The key fits the int64 keys file.
+        """
+        digest = hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest()
+        return int.from_bytes(digest, 'little', signed=True)
+    
     def _get_embedding(self, text: str) -> np.ndarray:
         """Get embedding for text with caching."""
-        cache_key = hash(text)
+        return self._process_batch_embeddings([text])[0]
+    
+    def prefetch_embedding(self, query: str) -> None:
+        """Start embedding a query in the background for a later query() call."""
         with self.cache_lock:
-            if cache_key in self.embeddings_cache:
-                return self.embeddings_cache[cache_key]
-                
+            if query not in self.pending_embeddings:
+                self.pending_embeddings[query] = self.prefetch_executor.submit(self._get_embedding, query)
+    
+    def _get_query_embedding(self, query: str) -> np.ndarray:
+        """Get a query's embedding, using a prefetched result if there is one."""
+        with self.cache_lock:
+            future = self.pending_embeddings.pop(query, None)
+        if future is not None:
+            return future.result()
+        return self._get_embedding(query)
+        
+    def _process_batch_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        """Get embeddings for texts, in order, with caching.
+        
+        Uncached texts are packed into as few embeddings requests as the
+        EMBEDDING_BATCH_TOKENS and EMBEDDING_BATCH_ITEMS limits allow.
+        """
+        embeddings = [None] * len(texts)
+        pending = []
+        with self.cache_lock:
+            for position, text in enumerate(texts):
+                cache_key = self._embedding_key(text)
+                cached = self.embeddings_cache.get(cache_key)
+                if cached is not None:
+                    self.embeddings_cache.move_to_end(cache_key)
+                    embeddings[position] = cached.astype(np.float32)
+                else:
+                    pending.append((position, cache_key, text))
+        
+        batch = []
+        batch_tokens = 0
+        for position, cache_key, text in pending:
+            # Every token covers at least one UTF-8 byte, so a text with no more
+            # bytes than the token limit always fits and is not tokenized; its
+            # count for packing is estimated at four bytes per token
+            num_bytes = len(text) if text.isascii() else len(text.encode('utf-8'))
+            if num_bytes <= MAX_EMBEDDING_TOKENS:
+                num_tokens = num_bytes // 4 + 1
+            else:
+                tokens = self.tokenizer.encode(text, disallowed_special=())
+                if len(tokens) > MAX_EMBEDDING_TOKENS:
+                    tokens = tokens[:MAX_EMBEDDING_TOKENS]
+                    text = self.tokenizer.decode(tokens)
+                num_tokens = len(tokens)
+            
+            if batch and (batch_tokens + num_tokens > EMBEDDING_BATCH_TOKENS
+                          or len(batch) == EMBEDDING_BATCH_ITEMS):
+                self._request_embeddings(batch, embeddings)
+                batch = []
+                batch_tokens = 0
+            batch.append((position, cache_key, text))
+            batch_tokens += num_tokens
+        
+        if batch:
+            self._request_embeddings(batch, embeddings)
+        return embeddings
+    
+    def _request_embeddings(self, batch: List[Tuple[int, int, str]],
+                            embeddings: List[Optional[np.ndarray]]) -> None:
+        """Embed a packed batch in one request and cache the results.
+        
+        Embeddings are normalized to unit length so inner product search
+        ranks them by cosine similarity. They are cached at STORAGE_DTYPE
+        precision.
+        """
         response = self._api_call_with_retry(
             self.client.embeddings.create,
             model=self.embedding_model,
-            input=text
+            input=[text for _, _, text in batch]
         )
-        
-        embedding = np.array(response.data[0].embedding, dtype=np.float32)
+        matrix = np.array([data.embedding for data in response.data], dtype=np.float32)
+        faiss.normalize_L2(matrix)
+        stored = matrix.astype(STORAGE_DTYPE)
         
         with self.cache_lock:
-            self.embeddings_cache[cache_key] = embedding
+            for data, embedding, stored_embedding in zip(response.data, matrix, stored):
+                position, cache_key, _ = batch[data.index]
+                embeddings[position] = embedding
+                self.embeddings_cache[cache_key] = stored_embedding
             self._manage_cache_size()
             
-        return embedding
+    @staticmethod
+    def _scan_summaries(top: str) -> Tuple[Dict[str, List[float]], str]:
+        """Find the summary files under top in one scandir walk.
         
-    def _process_batch_embeddings(self, texts: List[str]) -> List[np.ndarray]:
-        """Process a batch of texts to get embeddings."""
-        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-            futures = [executor.submit(self._get_embedding, text) for text in texts]
-            return [future.result() for future in as_completed(futures)]
-            
+        Returns each file's [mtime, size], sorted by path, and a digest over
+        all of them.
+        """
+        manifest = {}
+        pending = [top]
+        while pending:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.name.endswith(".md") and entry.is_file():
+                        stat = entry.stat()
+                        manifest[entry.path] = [stat.st_mtime, stat.st_size]
+        manifest = dict(sorted(manifest.items()))
+        digest = hashlib.blake2b(
+            "\n".join(
+                f"{path}\x00{mtime}\x00{size}"
+                for path, (mtime, size) in manifest.items()
+            ).encode("utf-8"),
+            digest_size=16
+        ).hexdigest()
+        return manifest, digest
+    
     def initialize(self, summaries_dir: str) -> bool:
-        """Initialize the knowledge base with batched processing."""
+        """Initialize the knowledge base with batched processing.
+        
+        If no summary has changed since the last run, the saved index is
+        loaded instead. Otherwise only new or modified summaries are embedded.
+        """
         try:
             # Load and validate summaries
             summaries_path = Path(summaries_dir)
             if not summaries_path.exists():
                 raise FileNotFoundError(f"Directory not found: {summaries_dir}")
                 
-            summary_files = list(summaries_path.rglob("*.md"))
+            manifest, digest = self._scan_summaries(str(summaries_path))
+            summary_files = list(manifest)
             if not summary_files:
                 raise ValueError("No summary files found")
                 
-            # Initialize FAISS index
-            self.index = faiss.IndexFlatL2(EMBEDDING_DIMENSION)
+            # Skip embedding entirely when the summaries are unchanged
+            if self._load_state(summaries_dir, digest):
+                print(f"{Fore.GREEN}✓ Loaded {len(self.documents)} unchanged summaries from saved index{Style.RESET_ALL}")
+                return True
+            
+            # Embeddings of summaries unchanged since the last run
+            reusable = self._load_reusable_embeddings(summaries_dir, manifest)
+            
+            self.documents = DocumentStore()
             total_files = len(summary_files)
-            processed_files = 0
+            queued_files = 0
+            
+            # One row per summary, in summary_files order
+            embeddings = np.empty((total_files, EMBEDDING_DIMENSION), dtype=np.float32)
+            
+            # Read new and modified summaries in the background, in order, so
+            # disk I/O overlaps with the embedding requests, and keep several
+            # embedding batches in flight at once. Both are windowed so only a
+            # bounded amount of summary text is held in memory.
+            to_read = [path for path in summary_files if path not in reusable]
+            pending = deque()
+            processed_files = len(reusable)
             
-            with Halo(text='Processing summaries...', spinner='dots') as spinner:
+            # Identical summaries (boilerplate, generated files) are embedded
+            # once; their other rows are copied from the first occurrence
+            first_rows = {}
+            duplicates = []
+            with ThreadPoolExecutor(max_workers=READ_WORKERS) as reader, \
+                    ThreadPoolExecutor(max_workers=EMBEDDING_WORKERS) as embedder, \
+                    Halo(text='Processing summaries...', spinner='dots') as spinner:
+                contents = self._read_ahead(reader, to_read)
+                
+                def collect_oldest() -> None:
+                    nonlocal processed_files
+                    batch_rows, future = pending.popleft()
+                    for row, embedding in zip(batch_rows, future.result()):
+                        embeddings[row] = embedding
+                    
+                    # Update progress
+                    processed_files += len(batch_rows)
+                    spinner.text = f'Processed {processed_files}/{total_files} files'
+                
                 # Process files in batches
                 for batch in self._batch_generator(summary_files, BATCH_SIZE):
                     batch_texts = []
-                    batch_docs = []
+                    batch_rows = []
                     
-                    # Load batch content
-                    for file_path in batch:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
+                    # Load batch content, reusing unchanged documents
+                    for row, source in enumerate(batch, queued_files):
+                        previous = reusable.get(source)
+                        if previous:
+                            created_at, summary_only, token_count, embedding = previous
+                            self.documents.append(source, created_at, summary_only, token_count)
+                            embeddings[row] = embedding
+                            continue
+                        
+                        content = next(contents)
+                        summary_only = self._extract_summary(content)
+                        content_key = self._embedding_key(content)
+                        if content_key in first_rows:
+                            duplicates.append((row, first_rows[content_key]))
+                        else:
+                            first_rows[content_key] = row
+                            batch_rows.append(row)
                             batch_texts.append(content)
-                            batch_docs.append({
-                                'content': content,
-                                'metadata': {
-                                    'source_file': str(file_path),
-                                    'created_at': file_path.stat().st_mtime
-                                }
-                            })
-                            
-                    # Get embeddings for batch
-                    batch_embeddings = self._process_batch_embeddings(batch_texts)
+                        self.documents.append(
+                            source,
+                            manifest[source][0],
+                            summary_only,
+                            len(self.tokenizer.encode(summary_only, disallowed_special=()))
+                        )
                     
-                    # Add to index and documents
-                    self.index.add(np.vstack(batch_embeddings))
-                    self.documents.extend(batch_docs)
+                    # Queue embeddings for new and modified files
+                    if batch_texts:
+                        pending.append((batch_rows, embedder.submit(self._process_batch_embeddings, batch_texts)))
+                        if len(pending) > EMBEDDING_AHEAD:
+                            collect_oldest()
+                    queued_files += len(batch)
                     
-                    # Update progress
-                    processed_files += len(batch)
-                    spinner.text = f'Processed {processed_files}/{total_files} files'
+                # Collect the remaining embeddings in submission order
+                while pending:
+                    collect_oldest()
                     
-                spinner.succeed(f'Successfully processed {total_files} files')
+                for row, first_row in duplicates:
+                    embeddings[row] = embeddings[first_row]
+                
+                # Build the FAISS index once every embedding is known
+                spinner.text = 'Building search index...'
+                self.index = self._build_index(embeddings)
+                self.search_matrix = embeddings if total_files < HNSW_MIN_VECTORS else None
+                self._attach_gpu_index()
+                
+                spinner.succeed(
+                    f'Successfully processed {total_files} files '
+                    f'({total_files - len(reusable) - len(duplicates)} embedded, '
+                    f'{len(duplicates)} duplicate, {len(reusable)} unchanged)'
+                )
                 
             # Save index and cache
-            self._save_state(summaries_dir)
+            reusable.clear()
+            self._save_state(summaries_dir, embeddings, manifest, digest)
             return True
             
         except Exception as e:
             print(f"{Fore.RED}Error initializing knowledge base: {str(e)}{Style.RESET_ALL}")
             return False
             
-    def _save_state(self, base_dir: str) -> None:
+    @staticmethod
+    def _build_index(embeddings: np.ndarray) -> faiss.Index:
+        """Build a FAISS index suited to the number of embeddings.
+        
+        Small collections use exhaustive search. From HNSW_MIN_VECTORS on, an
+        HNSW graph is built so a query visits a small neighborhood instead of
+        every embedding. From IVF_MIN_VECTORS on, where the graph becomes
+        costly to build and hold, an inverted file index is trained so each
+        query only scans the nearest IVF_NPROBE partitions. All of them use
+        inner product on unit-length embeddings, i.e. cosine similarity, and
+        store vectors as fp16 to halve the memory scanned per query.
+        """
+        # Embeddings saved by older versions may not be normalized yet
+        faiss.normalize_L2(embeddings)
+        
+        num_vectors = len(embeddings)
+        if num_vectors >= IVF_MIN_VECTORS:
+            # About 4*sqrt(N) partitions, keeping ~39 training points per partition
+            nlist = max(16, min(int(4 * np.sqrt(num_vectors)), num_vectors // 39))
+            quantizer = faiss.IndexFlatIP(EMBEDDING_DIMENSION)
+            index = faiss.IndexIVFScalarQuantizer(
+                quantizer, EMBEDDING_DIMENSION, nlist,
+                faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+            )
+        elif num_vectors >= HNSW_MIN_VECTORS:
+            index = faiss.IndexHNSWSQ(
+                EMBEDDING_DIMENSION, faiss.ScalarQuantizer.QT_fp16, HNSW_M, faiss.METRIC_INNER_PRODUCT
+            )
+            index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        else:
+            index = faiss.IndexScalarQuantizer(
+                EMBEDDING_DIMENSION, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+            )
+        if not index.is_trained:
+            index.train(embeddings)
+        KnowledgeBase._apply_search_params(index)
+        index.add(embeddings)
+        return index
+    
+    @staticmethod
+    def _apply_search_params(index: faiss.Index) -> None:
+        """Set the per-query search breadth of an HNSW or IVF index."""
+        if hasattr(index, 'hnsw'):
+            index.hnsw.efSearch = HNSW_EF_SEARCH
+        if hasattr(index, 'nprobe'):
+            index.nprobe = min(index.nlist, IVF_NPROBE)
+    
+    def _attach_gpu_index(self) -> None:
+        """Copy the index to the first GPU when KB_USE_GPU is set and one exists.
+        
+        The GPU copy is only used for batched searches; single queries stay
+        on the CPU index, where they avoid the transfer overhead.
+        """
+        self.gpu_index = None
+        if not KB_USE_GPU or not hasattr(faiss, 'get_num_gpus') or faiss.get_num_gpus() == 0:
+            return
+        try:
+            if self.gpu_resources is None:
+                self.gpu_resources = faiss.StandardGpuResources()
+            self.gpu_index = faiss.index_cpu_to_gpu(self.gpu_resources, 0, self.index)
+            print(f"{Fore.GREEN}✓ Using GPU for batched search{Style.RESET_ALL}")
+        except Exception as e:
+            print(f"{Fore.YELLOW}Could not move index to GPU: {str(e)}{Style.RESET_ALL}")
+    
+    def _save_state(self, base_dir: str, embeddings: np.ndarray,
+                    manifest: Dict[str, List[float]], digest: str) -> None:
         """Save index and cache state."""
         state_dir = Path(base_dir) / '.kb_state'
         state_dir.mkdir(exist_ok=True)
@@ -154,62 +616,158 @@ class KnowledgeBase:
         # Save FAISS index
         faiss.write_index(self.index, str(state_dir / 'kb.index'))
         
-        # Save documents and cache
-        with open(state_dir / 'documents.pkl', 'wb') as f:
-            pickle.dump(self.documents, f)
-            
-        with open(state_dir / 'cache.pkl', 'wb') as f:
-            pickle.dump(self.embeddings_cache, f)
+        # Save documents
+        self.documents.save(state_dir)
+        
+        # Save the embeddings cache as one key array and one vector matrix
+        with self.cache_lock:
+            cache_keys = np.fromiter(self.embeddings_cache.keys(), dtype=np.int64,
+                                     count=len(self.embeddings_cache))
+            if self.embeddings_cache:
+                cache_vectors = np.vstack(list(self.embeddings_cache.values()))
+            else:
+                cache_vectors = np.empty((0, EMBEDDING_DIMENSION), dtype=STORAGE_DTYPE)
+        _replace_npy(state_dir / 'cache_keys.npy', cache_keys)
+        _replace_npy(state_dir / 'cache.npy', cache_vectors)
+        (state_dir / 'cache.pkl').unlink(missing_ok=True)
             
-    def _load_state(self, base_dir: str) -> bool:
-        """Load saved index and cache state."""
+        # Save raw embeddings for incremental updates
+        _replace_npy(state_dir / 'embeddings.npy', embeddings.astype(STORAGE_DTYPE))
+        
+        # Written last so a partial save never looks up to date
+        with open(state_dir / 'manifest.json', 'w', encoding='utf-8') as f:
+            json.dump({'digest': digest, 'files': manifest}, f)
+    
+    @staticmethod
+    def _load_embeddings_cache(state_dir: Path) -> "OrderedDict[int, np.ndarray]":
+        """Load the saved embeddings cache, memory mapping its vectors.
+        
+        Only the vectors that are actually looked up are read from disk. A
+        missing or unreadable cache just starts empty.
+        """
+        try:
+            cache_keys = np.load(state_dir / 'cache_keys.npy')
+            cache_vectors = np.load(state_dir / 'cache.npy', mmap_mode='r')
+        except Exception:
+            return OrderedDict()
+        if len(cache_keys) != len(cache_vectors):
+            return OrderedDict()
+        # Saved least recently used first, so LRU order carries over
+        return OrderedDict(zip(cache_keys.tolist(), cache_vectors))
+    
+    def _load_reusable_embeddings(self, base_dir: str,
+                                  manifest: Dict[str, List[float]]) -> Dict[str, Tuple[float, str, int, np.ndarray]]:
+        """Return saved document fields and embeddings for files that are unchanged."""
+        state_dir = Path(base_dir) / '.kb_state'
+        try:
+            with open(state_dir / 'manifest.json', 'r', encoding='utf-8') as f:
+                saved_files = json.load(f).get('files', {})
+            documents = DocumentStore.load(state_dir)
+            embeddings = np.load(state_dir / 'embeddings.npy', mmap_mode='r')
+        except Exception:
+            return {}
+        
+        reusable = {}
+        if len(documents) == len(embeddings):
+            for i, source in enumerate(documents.sources):
+                if source in manifest and saved_files.get(source) == manifest[source]:
+                    reusable[source] = (
+                        documents.created_at[i],
+                        documents.summary(i),
+                        documents.token_counts[i],
+                        embeddings[i]
+                    )
+        documents.clear()
+        return reusable
+    
+    def _load_state(self, base_dir: str, digest: Optional[str] = None) -> bool:
+        """Load saved index and cache state.
+        
+        If digest is given, the state is only loaded when it was saved for
+        the same set of summary files.
+        """
         try:
             state_dir = Path(base_dir) / '.kb_state'
             if not state_dir.exists():
                 return False
                 
-            # Load FAISS index
-            self.index = faiss.read_index(str(state_dir / 'kb.index'))
+            if digest is not None:
+                manifest_path = state_dir / 'manifest.json'
+                if not manifest_path.exists():
+                    return False
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    if json.load(f).get('digest') != digest:
+                        return False
+            
+            # Map the FAISS index read-only instead of reading it into memory;
+            # it is never modified after loading
+            self.index = faiss.read_index(
+                str(state_dir / 'kb.index'),
+                faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+            )
+            self._apply_search_params(self.index)
+            self._attach_gpu_index()
+            
+            # Small collections are searched with a matrix product instead
+            self.search_matrix = None
+            if self.index.ntotal < HNSW_MIN_VECTORS:
+                self.search_matrix = np.load(state_dir / 'embeddings.npy').astype(np.float32)
             
             # Load documents and cache
-            with open(state_dir / 'documents.pkl', 'rb') as f:
-                self.documents = pickle.load(f)
-                
-            with open(state_dir / 'cache.pkl', 'rb') as f:
-                self.embeddings_cache = pickle.load(f)
-                
+            self.documents = DocumentStore.load(state_dir)
+            self.embeddings_cache = self._load_embeddings_cache(state_dir)
+            
             return True
             
         except Exception as e:
             print(f"{Fore.YELLOW}Could not load saved state: {str(e)}{Style.RESET_ALL}")
             return False
             
-    def query(self, query: str, top_k: int = 5) -> Tuple[str, Dict]:
-        """Query the knowledge base with optimized search."""
+    def query(self, query: str, top_k: int = 5,
+              on_token: Optional[Callable[[str], None]] = None) -> Tuple[str, Dict]:
+        """Query the knowledge base with optimized search.
+        
+        If on_token is given, it is called with each piece of the response
+        as soon as it is generated.
+        """
         try:
             # Get query embedding
-            query_embedding = self._get_embedding(query)
+            query_embedding = self._get_query_embedding(query)
             
             # Search index
-            D, I = self.index.search(np.array([query_embedding]), top_k)
+            D, I = self._search(query_embedding.reshape(1, -1), top_k)
             
             # Get relevant documents
-            results = []
-            for idx in I[0]:
-                if 0 <= idx < len(self.documents):
-                    results.append(self.documents[idx])
-                    
-            # Format context
+            results = [int(idx) for idx in I[0] if 0 <= idx < len(self.documents)]
+            doc_ids = tuple(results)
+            
+            # Reuse the answer to a near-identical earlier question that was
+            # answered from the same documents
+            cached_response = self._find_similar_response(query_embedding, doc_ids)
+            if cached_response is not None:
+                if on_token:
+                    on_token(cached_response)
+                return cached_response, {
+                    'model': self.model,
+                    'total_tokens': 0,
+                    'num_results': len(results),
+                    'cached': True
+                }
+            
+            # Format context within the token budget
+            results, pruned_tokens = self._fit_to_budget(results)
             context = self._format_context(results)
             
             # Get AI response
-            response = self._get_ai_response(query, context)
+            response, total_tokens = self._get_ai_response(query, context, on_token)
+            self._cache_similar_response(query, query_embedding, doc_ids, response)
             
             # Get token usage
             usage_stats = {
                 'model': self.model,
-                'total_tokens': len(self.tokenizer.encode(context + query + response)),
-                'num_results': len(results)
+                'total_tokens': total_tokens,
+                'num_results': len(results),
+                'context_tokens_pruned': pruned_tokens
             }
             
             return response, usage_stats
@@ -218,18 +776,128 @@ class KnowledgeBase:
             print(f"{Fore.RED}Error processing query: {str(e)}{Style.RESET_ALL}")
             raise
             
-    def _format_context(self, results: List[Dict]) -> str:
+    def query_batch(self, queries: List[str], top_k: int = 5,
+                    on_token: Optional[Callable[[str], None]] = None) -> Tuple[str, Dict]:
+        """Answer several questions with a single completion.
+        
+        The summaries retrieved for all of the questions are merged into one
+        shared context, and the questions are asked as a numbered list.
+        """
+        try:
+            # Search the index for every question at once
+            query_embeddings = np.vstack([self._get_query_embedding(q) for q in queries])
+            D, I = self._search(query_embeddings, top_k)
+            
+            # Merge the relevant documents rank by rank, keeping each one once
+            results = []
+            seen = set()
+            for idx in I.T.ravel().tolist():
+                if 0 <= idx < len(self.documents) and idx not in seen:
+                    seen.add(idx)
+                    results.append(idx)
+            
+            # Format context within the token budget, and the numbered questions
+            results, pruned_tokens = self._fit_to_budget(results)
+            context = self._format_context(results)
+            questions = "\n".join(f"{i}. {q}" for i, q in enumerate(queries, 1))
+            combined_query = (
+                "Answer each of the following questions, numbering each answer "
+                f"to match its question:\n{questions}"
+            )
+            
+            # Get AI response
+            response, total_tokens = self._get_ai_response(combined_query, context, on_token)
+            
+            # Get token usage
+            usage_stats = {
+                'model': self.model,
+                'total_tokens': total_tokens,
+                'num_results': len(results),
+                'num_queries': len(queries),
+                'context_tokens_pruned': pruned_tokens
+            }
+            
+            return response, usage_stats
+        
+        except Exception as e:
+            print(f"{Fore.RED}Error processing queries: {str(e)}{Style.RESET_ALL}")
+            raise
+    
+    def _search(self, query_embeddings: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return the scores and document indices of the top_k matches per query row.
+        
+        Small collections are scored with a single matrix product against
+        search_matrix, which BLAS handles faster than the fp16 index scan.
+        Otherwise the FAISS index is searched, on the GPU for batches when a
+        GPU copy exists.
+        """
+        if self.search_matrix is None:
+            index = self.index
+            if self.gpu_index is not None and len(query_embeddings) > 1:
+                index = self.gpu_index
+            return index.search(query_embeddings, top_k)
+        
+        scores = query_embeddings @ self.search_matrix.T
+        top_k = min(top_k, scores.shape[1])
+        I = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+        
+        # argpartition leaves the top_k unordered
+        D = np.take_along_axis(scores, I, axis=1)
+        order = np.argsort(-D, axis=1)
+        return np.take_along_axis(D, order, axis=1), np.take_along_axis(I, order, axis=1)
+    
+    @staticmethod
+    def _extract_summary(content: str) -> str:
+        """Return the content from the "## Summary" heading on, or all of it."""
+        start = content.find("## Summary")
+        return content[start:] if start != -1 else content
+    
+    def _fit_to_budget(self, results: List[int]) -> Tuple[List[int], int]:
+        """Keep the most relevant results that fit within CONTEXT_TOKEN_BUDGET.
+        
+        Takes and returns document indices, plus the number of tokens
+        dropped. The top result is always kept so there is some context to
+        answer from.
+        """
+        kept = []
+        used_tokens = 0
+        pruned_tokens = 0
+        token_counts = self.documents.token_counts
+        for idx in results:
+            token_count = token_counts[idx]
+            if kept and used_tokens + token_count > CONTEXT_TOKEN_BUDGET:
+                pruned_tokens += token_count
+                continue
+            kept.append(idx)
+            used_tokens += token_count
+        return kept, pruned_tokens
+    
+    def _format_context(self, results: List[int]) -> str:
         """Format search results into context."""
-        context_parts = []
-        for doc in results:
-            metadata = doc['metadata']
-            content = doc['content']
-            context_parts.append(f"File: {metadata['source_file']}\n{content}\n---\n")
-        return "\n".join(context_parts)
-        
-    def _get_ai_response(self, query: str, context: str) -> str:
-        """Get AI response with retry logic."""
-        response = self._api_call_with_retry(
+        documents = self.documents
+        return "\n".join(
+            f"File: {documents.sources[idx]}\n{documents.summary(idx)}\n---\n"
+            for idx in results
+        )
+        
+    def _get_ai_response(self, query: str, context: str,
+                         on_token: Optional[Callable[[str], None]] = None) -> Tuple[str, int]:
+        """Get a streamed AI response with retry logic and response caching.
+        
+        Returns the response and the total tokens the API reported for it,
+        or 0 when the response came from the cache.
+        """
+        cache_key = hashlib.blake2b(
+            f"{self.model}\x00{query}\x00{context}".encode("utf-8"),
+            digest_size=16
+        ).hexdigest()
+        cached_response = self._get_cached_response(cache_key)
+        if cached_response is not None:
+            if on_token:
+                on_token(cached_response)
+            return cached_response, 0
+        
+        stream = self._api_call_with_retry(
             self.client.chat.completions.create,
             model=self.model,
             messages=[
@@ -247,18 +915,43 @@ class KnowledgeBase:
                 }
             ],
             temperature=0.7,
-            max_tokens=800
+            max_tokens=800,
+            stream=True,
+            stream_options={"include_usage": True}
         )
         
-        return response.choices[0].message.content
+        parts = []
+        total_tokens = 0
+        for chunk in stream:
+            # The final chunk carries usage for the whole request and no choices
+            if chunk.usage:
+                total_tokens = chunk.usage.total_tokens
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                if on_token:
+                    on_token(delta)
+        
+        content = "".join(parts)
+        self._cache_response(cache_key, content)
+        return content, total_tokens
         
     def cleanup(self) -> None:
         """Clean up resources."""
-        # Clear cache
+        # Clear caches
+        self.prefetch_executor.shutdown(wait=False, cancel_futures=True)
+        self.pending_embeddings.clear()
         self.embeddings_cache.clear()
+        self.response_cache.clear()
+        self.semantic_cache.clear()
         
         # Clear memory
         self.documents.clear()
-        if self.index:
-            self.index.reset()
-            self.index = None 
\ No newline at end of file
+        self.gpu_index = None
+        self.gpu_resources = None
+        self.search_matrix = None
+        # Drop the index rather than reset() it, since a loaded index is
+        # mapped read-only
+        self.index = None 
\ No newline at end of file
@@ -2,15 +2,72 @@
 
 import os
 import sys
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from dotenv import load_dotenv
 from colorama import init, Fore, Style
+from prompt_toolkit import PromptSession
+from prompt_toolkit.completion import WordCompleter
+from prompt_toolkit.formatted_text import ANSI
+from prompt_toolkit.history import InMemoryHistory
+from prompt_toolkit.key_binding import DynamicKeyBindings
+from prompt_toolkit.patch_stdout import patch_stdout
 from .knowledge_base import KnowledgeBase
 from .tts_stt.hotkeys import setup_voice_interface
+from .tts_stt.text_to_speech import SentenceStreamer
 
-# Initialize colorama
-init()
+@lru_cache(maxsize=1)
+def find_summary_directories(summaries_dir: str) -> Tuple[str, ...]:
+    """Return the summary run directories under summaries_dir, newest first."""
+    try:
+        with os.scandir(summaries_dir) as it:
+            entries = [
+                entry for entry in it
+                if entry.name.startswith("summary_") and entry.is_dir(follow_symlinks=False)
+            ]
+    except OSError:
+        return ()
+    entries.sort(key=lambda entry: entry.stat().st_ctime, reverse=True)
+    return tuple(entry.path for entry in entries)
+
+def _safe_load_json(path: str) -> Optional[Dict]:
+    """Load a JSON file, returning None if it is missing or invalid."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def select_summary_directory(summaries_dir: str) -> Optional[str]:
+    """Prompt the user to choose a summary run, defaulting to the newest."""
+    summary_dirs = find_summary_directories(os.path.abspath(summaries_dir))
+    if len(summary_dirs) <= 1:
+        return summary_dirs[0] if summary_dirs else None
+    
+    # Read all run metadata concurrently; capped to stay well within FD limits
+    metadata_paths = [os.path.join(d, "metadata.json") for d in summary_dirs]
+    with ThreadPoolExecutor(max_workers=min(16, len(metadata_paths))) as executor:
+        all_metadata = list(executor.map(_safe_load_json, metadata_paths))
+    
+    print(f"\n{Fore.CYAN}Available summary runs:{Style.RESET_ALL}")
+    for i, (directory, metadata) in enumerate(zip(summary_dirs, all_metadata), 1):
+        details = ""
+        if metadata:
+            model = metadata.get("model", "N/A")
+            total_files = metadata.get("analysis", {}).get("total_files", "N/A")
+            details = f" (model: {model}, files: {total_files})"
+        print(f"{i}. {os.path.basename(directory)}{details}")
+    
+    while True:
+        choice = input(f"\n{Fore.GREEN}Select a run (Enter for latest, 1-{len(summary_dirs)}): {Style.RESET_ALL}").strip()
+        if not choice:
+            return summary_dirs[0]
+        if choice.isdigit() and 1 <= int(choice) <= len(summary_dirs):
+            return summary_dirs[int(choice) - 1]
+        print(f"{Fore.RED}Invalid choice. Please try again.{Style.RESET_ALL}")
 
 class QueryInterface:
     def __init__(self, model: str = "gpt-3.5-turbo"):
@@ -20,6 +77,21 @@ class QueryInterface:
         self.kb = KnowledgeBase(model=model)
         self.voice_manager = None
         
+        # Answers are generated in the background so the next query can be
+        # typed, and its embedding fetched, while the current one streams
+        self.answer_executor = ThreadPoolExecutor(max_workers=1)
+        self.pending_answer = None
+        
+        # Line editing, history and command completion for the query prompt.
+        # Voice hotkeys are only bound while the voice interface is enabled.
+        self.session = PromptSession(
+            history=InMemoryHistory(),
+            completer=WordCompleter(["exit", "voice"], ignore_case=True),
+            key_bindings=DynamicKeyBindings(
+                lambda: self.voice_manager.key_bindings if self.voice_manager else None
+            )
+        )
+        
         # Ensure OpenAI API key is set
         if not os.getenv("OPENAI_API_KEY"):
             print(f"{Fore.RED}Error: OPENAI_API_KEY not found in environment variables.{Style.RESET_ALL}")
@@ -35,6 +107,12 @@ class QueryInterface:
                 print(f"{Fore.RED}Error: Summaries directory not found at {summaries_dir}")
                 print("Please run the summarizer first.{Style.RESET_ALL}")
                 return False
+            
+            # Index a single summarizer run rather than every run
+            selected_dir = select_summary_directory(summaries_dir)
+            if selected_dir:
+                summaries_dir = selected_dir
+                print(f"\n{Fore.CYAN}Using summaries from: {summaries_dir}{Style.RESET_ALL}")
                 
             print(f"\n{Fore.CYAN}Loading knowledge base...{Style.RESET_ALL}")
             self.kb.initialize(summaries_dir)
@@ -47,8 +125,27 @@ class QueryInterface:
     def _handle_query(self, query: str):
         """Process a query and handle the response."""
         try:
-            response = self.kb.query(query)
-            print(f"\n{Fore.GREEN}Assistant: {response}{Style.RESET_ALL}")
+            # With voice enabled, speak each sentence as soon as it streams in
+            speaker = SentenceStreamer(self.voice_manager.voice_id) if self.voice_manager else None
+            
+            def on_token(token: str):
+                print(token, end="", flush=True)
+                if speaker:
+                    speaker.feed(token)
+            
+            # Several pasted lines are answered together in one request
+            queries = [line.strip() for line in query.splitlines() if line.strip()]
+            
+            print(f"\n{Fore.GREEN}Assistant: ", end="", flush=True)
+            try:
+                if len(queries) > 1:
+                    response, _ = self.kb.query_batch(queries, on_token=on_token)
+                else:
+                    response, _ = self.kb.query(query, on_token=on_token)
+            finally:
+                print(Style.RESET_ALL)
+                if speaker:
+                    speaker.close()
             
             if self.voice_manager:
                 self.voice_manager.set_last_response(response)
@@ -56,6 +153,21 @@ class QueryInterface:
         except Exception as e:
             print(f"{Fore.RED}Error processing query: {str(e)}{Style.RESET_ALL}")
             
+    def _wait_for_answer(self):
+        """Block until the answer currently being generated has finished."""
+        if self.pending_answer:
+            self.pending_answer.result()
+            self.pending_answer = None
+    
+    def _submit_query(self, query: str):
+        """Start answering a query once the previous answer has finished."""
+        # Embed the new query while the previous answer is still streaming
+        for line in query.splitlines():
+            if line.strip():
+                self.kb.prefetch_embedding(line.strip())
+        self._wait_for_answer()
+        self.pending_answer = self.answer_executor.submit(self._handle_query, query)
+    
     def run(self, use_voice: bool = False):
         """Run the interactive query interface."""
         print(f"\n{Fore.CYAN}Welcome to the Code Inspector Query Interface!")
@@ -64,36 +176,44 @@ class QueryInterface:
         print(f"Current model: {self.kb.model}{Style.RESET_ALL}\n")
         
         try:
-            while True:
-                if use_voice and not self.voice_manager:
-                    self.voice_manager = setup_voice_interface(callback=self._handle_query)
-                    
-                print(f"\n{Fore.YELLOW}Query: {Style.RESET_ALL}", end="")
-                query = input().strip()
-                
-                if query.lower() == "exit":
-                    break
-                elif query.lower() == "voice":
-                    use_voice = not use_voice
-                    if use_voice:
-                        if not self.voice_manager:
-                            self.voice_manager = setup_voice_interface(callback=self._handle_query)
-                        print(f"{Fore.CYAN}Voice interface enabled.{Style.RESET_ALL}")
-                    else:
-                        if self.voice_manager:
-                            self.voice_manager.cleanup()
-                            self.voice_manager = None
-                        print(f"{Fore.CYAN}Voice interface disabled.{Style.RESET_ALL}")
-                    continue
-                    
-                if query and not query.isspace():
-                    self._handle_query(query)
-                    
-        except KeyboardInterrupt:
+            # Output streamed by the answer thread is printed above the prompt
+            with patch_stdout(raw=True):
+                self._run_loop(use_voice)
+        except (KeyboardInterrupt, EOFError):
             print(f"\n{Fore.CYAN}Exiting...{Style.RESET_ALL}")
         finally:
+            self.answer_executor.shutdown(wait=False, cancel_futures=True)
             if self.voice_manager:
                 self.voice_manager.cleanup()
+    
+    def _run_loop(self, use_voice: bool):
+        """Read and dispatch queries until the user exits."""
+        while True:
+            if use_voice and not self.voice_manager:
+                self.voice_manager = setup_voice_interface(callback=self._submit_query)
+            
+            print()
+            query = self.session.prompt(ANSI(f"{Fore.YELLOW}Query: {Style.RESET_ALL}")).strip()
+            
+            if query.lower() == "exit":
+                self._wait_for_answer()
+                break
+            elif query.lower() == "voice":
+                self._wait_for_answer()
+                use_voice = not use_voice
+                if use_voice:
+                    if not self.voice_manager:
+                        self.voice_manager = setup_voice_interface(callback=self._submit_query)
+                    print(f"{Fore.CYAN}Voice interface enabled.{Style.RESET_ALL}")
+                else:
+                    if self.voice_manager:
+                        self.voice_manager.cleanup()
+                        self.voice_manager = None
+                    print(f"{Fore.CYAN}Voice interface disabled.{Style.RESET_ALL}")
+                continue
+            
+            if query and not query.isspace():
+                self._submit_query(query)
                 
 def main():
     """Main entry point."""
@@ -102,4 +222,6 @@ def main():
         interface.run(use_voice=False)
         
 if __name__ == "__main__":
+    # Initialize colorama
+    init()
     main() 
\ No newline at end of file
@@ -4,7 +4,8 @@ from .text_to_speech import (
     read_text_aloud,
     get_available_voices,
     select_voice,
-    TTSManager
+    TTSManager,
+    SentenceStreamer
 )
 from .speech_to_text import (
     get_user_input,
@@ -17,6 +18,7 @@ __all__ = [
     'get_available_voices',
     'select_voice',
     'TTSManager',
+    'SentenceStreamer',
     'get_user_input',
     'test_microphone',
     'STTManager'
@@ -1,8 +1,9 @@
 """Hotkey management for voice interface."""
 
-import keyboard
 from typing import Optional, Callable
 from colorama import Fore, Style
+from prompt_toolkit.application import run_in_terminal
+from prompt_toolkit.key_binding import KeyBindings
 from .text_to_speech import read_text_aloud, select_voice
 from .speech_to_text import get_user_input, transcribe_streaming
 
@@ -12,24 +13,36 @@ class HotkeyManager:
         self.last_response = None
         self.voice_id = None
         self.streaming = False
+        self.callback = None
+        self.key_bindings = KeyBindings()
         self._setup_hotkeys()
         
+    def _bind(self, key: str, handler: Callable[[], None]):
+        """Bind a key at the query prompt to a handler.
+        
+        The handler runs in a worker thread with the prompt suspended, so it
+        can print and read input normally.
+        """
+        @self.key_bindings.add(key)
+        def _(event):
+            run_in_terminal(handler, in_executor=True)
+    
     def _setup_hotkeys(self):
-        """Set up hotkey bindings."""
+        """Set up hotkey bindings for the query prompt."""
         # Voice input (Ctrl+B)
-        keyboard.add_hotkey('ctrl+b', self._handle_voice_input)
+        self._bind('c-b', self._handle_voice_input)
         
         # Read last response (Ctrl+N)
-        keyboard.add_hotkey('ctrl+n', self._read_last_response)
+        self._bind('c-n', self._read_last_response)
         
         # Toggle streaming (Ctrl+S)
-        keyboard.add_hotkey('ctrl+s', self._toggle_streaming)
+        self._bind('c-s', self._toggle_streaming)
         
         # Change voice (Ctrl+V)
-        keyboard.add_hotkey('ctrl+v', self._change_voice)
+        self._bind('c-v', self._change_voice)
         
         # Pause/Resume TTS (Ctrl+P)
-        keyboard.add_hotkey('ctrl+p', self._toggle_tts)
+        self._bind('c-p', self._toggle_tts)
         
         print(f"\n{Fore.CYAN}Hotkeys enabled:{Style.RESET_ALL}")
         print("  Ctrl+B: Voice input")
@@ -81,7 +94,8 @@ class HotkeyManager:
         
     def cleanup(self):
         """Clean up resources."""
-        keyboard.unhook_all()
+        self.key_bindings = KeyBindings()
+        self.callback = None
         
 def setup_voice_interface(callback: Optional[Callable[[str], None]] = None) -> HotkeyManager:
     """Set up voice interface with hotkeys."""
@@ -0,0 +1,31 @@
+"""Client-side rate limiting for the speech service APIs."""
+
+import threading
+import time
+
+class TokenBucket:
+    """Token bucket that makes callers wait briefly instead of hitting a quota.
+    
+    Up to `burst` calls go through at once; after that calls are spaced out
+    to `rate` per second.
+    """
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Take one token, sleeping until one is available."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
@@ -1,6 +1,7 @@
 """Speech-to-Text functionality using SpeechRecognition."""
 
 import os
+import io
 import time
 import speech_recognition as sr
 from typing import Optional, Dict, Callable
@@ -13,6 +14,19 @@ from rich.live import Live
 from rich.text import Text
 import threading
 import queue
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from .rate_limit import TokenBucket
+
+try:
+    from faster_whisper import WhisperModel  # Optional: faster offline recognition
+except ImportError:
+    WhisperModel = None
+
+try:
+    import webrtcvad  # Optional: skip recognition requests for captures with no speech
+except ImportError:
+    webrtcvad = None
 
 # Load environment variables
 load_dotenv()
@@ -21,36 +35,147 @@ load_dotenv()
 DEFAULT_TIMEOUT = int(os.getenv("STT_TIMEOUT", "10"))
 DEFAULT_AMBIENT_DURATION = float(os.getenv("AMBIENT_DURATION", "1.0"))
 DEFAULT_ENERGY_THRESHOLD = int(os.getenv("ENERGY_THRESHOLD", "4000"))
+ENERGY_CACHE_FILE = Path.home() / ".cache" / "code-inspector" / "stt_energy.txt"  # Calibrated threshold from a previous run
 MAX_RETRIES = 3
 RETRY_DELAY = 2
+OFFLINE_MODEL = os.getenv("STT_OFFLINE_MODEL", "tiny.en")  # faster-whisper model for offline fallback
+RECOGNITION_RATE = 16000  # Sample rate audio is sent for recognition at
+VAD_AGGRESSIVENESS = 2  # webrtcvad mode, 0 (lenient) to 3 (strict)
+VAD_FRAME_MS = 20  # webrtcvad accepts 10, 20 or 30 ms frames
+MIN_SPEECH_MS = 200  # Voiced audio needed before a capture is sent for recognition
+PAUSE_THRESHOLD = float(os.getenv("STT_PAUSE_THRESHOLD", "0.5"))  # Seconds of silence that end a phrase
+PHRASE_TIME_LIMIT = float(os.getenv("STT_PHRASE_LIMIT", "2.0"))  # Longest streamed phrase, in seconds; longer speech is joined back up
+LISTEN_PHRASE_LIMIT = float(os.getenv("STT_LISTEN_PHRASE_LIMIT", "30"))  # Longest phrase a single listen() captures, in seconds
+STREAM_POLL_INTERVAL = 0.25  # Longest wait for a transcript before rechecking the stream state
+
+# Queued for every phrase that could not be transcribed
+UNRECOGNIZED = ("error", "Could not understand audio")
+
+# Shared by every manager so rapid phrases queue briefly instead of failing
+google_limiter = TokenBucket(rate=50 / 60, burst=5)
+
+# Offline engine shared by every manager. Loading a Whisper model takes
+# seconds, so it happens the first time an online request fails rather
+# than each time a manager is created.
+offline_engine = None
+offline_engine_loaded = False
+offline_engine_lock = threading.Lock()
+
+def _offline_engine():
+    """Return the shared offline recognition engine, loading it on first use."""
+    global offline_engine, offline_engine_loaded
+    with offline_engine_lock:
+        if not offline_engine_loaded:
+            offline_engine_loaded = True
+            try:
+                if WhisperModel is not None:
+                    # INT8 on CPU runs well ahead of real time, unlike pocketsphinx
+                    offline_engine = WhisperModel(OFFLINE_MODEL, device="cpu", compute_type="int8")
+                else:
+                    offline_engine = pocketsphinx.Pocketsphinx()
+            except Exception as e:
+                print(f"{Fore.YELLOW}Warning: Offline STT engine not available: {str(e)}{Style.RESET_ALL}")
+        return offline_engine
+
+# Capture thread of the last listen() call on any manager. One cancelled
+# mid-phrase still holds the microphone until its phrase ends, and
+# get_user_input creates a new manager per query, so this is not per manager.
+capture_thread: Optional[threading.Thread] = None
 
 class STTManager:
     def __init__(self):
         """Initialize the STT manager with error handling."""
         try:
             self.recognizer = sr.Recognizer()
+            self.recognizer.pause_threshold = PAUSE_THRESHOLD
             self.microphone = sr.Microphone()
-            self.offline_engine = None
-            self._setup_offline_engine()
+            self.vad = webrtcvad.Vad(VAD_AGGRESSIVENESS) if webrtcvad is not None else None
             self.streaming = False
             self.stream_queue = queue.Queue()
             
-            # Configure recognizer
-            with self.microphone as source:
-                self.recognizer.energy_threshold = DEFAULT_ENERGY_THRESHOLD
-                self.adjust_for_ambient_noise(duration=DEFAULT_AMBIENT_DURATION)
+            # Configure recognizer. An explicit ENERGY_THRESHOLD is used as is;
+            # otherwise reuse the last calibration and only measure on first run.
+            self.recognizer.energy_threshold = DEFAULT_ENERGY_THRESHOLD
+            if os.getenv("ENERGY_THRESHOLD"):
+                self.recognizer.dynamic_energy_threshold = False
+            else:
+                cached = self._load_energy_threshold()
+                if cached is not None:
+                    self.recognizer.energy_threshold = cached
+                else:
+                    self.adjust_for_ambient_noise(duration=DEFAULT_AMBIENT_DURATION)
+            
+            # One Esc hook for the manager's lifetime; listening and streaming
+            # wait on what it signals instead of registering their own
+            self.interrupted = threading.Event()
+            self.hotkey = keyboard.add_hotkey('esc', self._on_escape)
                 
         except Exception as e:
             print(f"{Fore.RED}Error initializing STT: {str(e)}{Style.RESET_ALL}")
             print("Please check your microphone connection and permissions.")
             raise
             
-    def _setup_offline_engine(self):
-        """Set up offline speech recognition engine."""
+    def _downsample(self, audio: sr.AudioData) -> sr.AudioData:
+        """Resample captured audio to 16 kHz, 16-bit for recognition.
+        
+        Speech recognition gains nothing from higher rates, and microphones
+        often capture at 44.1 or 48 kHz, so this cuts the upload several-fold.
+        """
+        if audio.sample_rate <= RECOGNITION_RATE and audio.sample_width == 2:
+            return audio
+        return sr.AudioData(
+            audio.get_raw_data(convert_rate=RECOGNITION_RATE, convert_width=2), RECOGNITION_RATE, 2
+        )
+            
+    def _has_speech(self, audio: sr.AudioData) -> bool:
+        """Check whether a capture contains enough voiced audio to transcribe.
+        
+        Always True when webrtcvad is not installed.
+        """
+        if self.vad is None:
+            return True
+        raw = audio.get_raw_data(convert_rate=16000, convert_width=2)
+        frame_bytes = 16000 * VAD_FRAME_MS // 1000 * 2
+        voiced_ms = 0
+        for start in range(0, len(raw) - frame_bytes + 1, frame_bytes):
+            if self.vad.is_speech(raw[start:start + frame_bytes], 16000):
+                voiced_ms += VAD_FRAME_MS
+                if voiced_ms >= MIN_SPEECH_MS:
+                    return True
+        return False
+            
+    def _recognize_offline(self, audio: sr.AudioData) -> Optional[str]:
+        """Transcribe audio with the offline engine, or None if there is none."""
+        engine = _offline_engine()
+        if engine is None:
+            return None
+        if WhisperModel is not None and isinstance(engine, WhisperModel):
+            segments, _ = engine.transcribe(
+                io.BytesIO(audio.get_wav_data(convert_rate=16000)), beam_size=1, vad_filter=True
+            )
+            return " ".join(segment.text.strip() for segment in segments)
+        return engine.decode(audio.get_raw_data())
+            
+    def _on_escape(self):
+        """Wake whatever the manager is waiting on when Esc is pressed."""
+        self.interrupted.set()
+        if self.streaming:
+            self.stream_queue.put(("stop", None))
+            
+    def _load_energy_threshold(self) -> Optional[float]:
+        """Return the energy threshold saved by a previous calibration, if any."""
         try:
-            self.offline_engine = pocketsphinx.Pocketsphinx()
-        except Exception as e:
-            print(f"{Fore.YELLOW}Warning: Offline STT engine not available: {str(e)}{Style.RESET_ALL}")
+            return float(ENERGY_CACHE_FILE.read_text().strip())
+        except (OSError, ValueError):
+            return None
+            
+    def _save_energy_threshold(self) -> None:
+        """Persist the calibrated energy threshold for later runs."""
+        try:
+            ENERGY_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            ENERGY_CACHE_FILE.write_text(f"{self.recognizer.energy_threshold:.2f}")
+        except OSError as e:
+            print(f"{Fore.YELLOW}Warning: Could not save microphone calibration: {str(e)}{Style.RESET_ALL}")
             
     def adjust_for_ambient_noise(self, duration: float = DEFAULT_AMBIENT_DURATION) -> None:
         """Adjust microphone for ambient noise with visual feedback."""
@@ -59,82 +184,107 @@ class STTManager:
                 with self.microphone as source:
                     self.recognizer.adjust_for_ambient_noise(source, duration=duration)
                 spinner.succeed('Microphone adjusted successfully')
+            self._save_energy_threshold()
         except Exception as e:
             print(f"{Fore.RED}Error adjusting microphone: {str(e)}{Style.RESET_ALL}")
             raise
             
     def listen(self, timeout: int = DEFAULT_TIMEOUT, show_progress: bool = True) -> Optional[str]:
         """Listen for speech with progress indicator and error handling."""
+        global capture_thread
         try:
-            with self.microphone as source:
-                if show_progress:
-                    print(f"\n{Fore.CYAN}Listening... (Press 'Esc' to cancel){Style.RESET_ALL}")
+            if show_progress:
+                print(f"\n{Fore.CYAN}Listening... (Press 'Esc' to cancel){Style.RESET_ALL}")
+            
+            # A capture cancelled mid-phrase still holds the microphone until
+            # its phrase ends, and would otherwise wake this call when it does
+            if capture_thread:
+                capture_thread.join()
+            
+            phrases = []
+            errors = []
+            timed_out = threading.Event()
+            self.interrupted.clear()
+            
+            def capture():
+                """Capture one phrase on a worker thread, then wake the caller."""
+                deadline = time.monotonic() + timeout
+                try:
+                    with self.microphone as source:
+                        while not self.interrupted.is_set():
+                            try:
+                                # The timeout only bounds waiting for speech to
+                                # start; a phrase already under way is kept
+                                audio = self.recognizer.listen(source, timeout=1, phrase_time_limit=LISTEN_PHRASE_LIMIT)
+                            except sr.WaitTimeoutError:
+                                if time.monotonic() >= deadline:
+                                    timed_out.set()
+                                    break
+                                continue
+                            if not self.interrupted.is_set():
+                                phrases.append(audio)
+                            break
+                except Exception as e:
+                    errors.append(e)
+                finally:
+                    self.interrupted.set()
                     
-                # Start listening with timeout
-                start_time = time.time()
-                audio = None
-                
-                with Halo(text='Listening...', spinner='dots') as spinner:
-                    while True:
-                        try:
-                            # Check for Esc key
-                            if keyboard.is_pressed('esc'):
-                                spinner.fail('Listening cancelled')
-                                return None
-                                
-                            # Update progress
-                            elapsed = time.time() - start_time
-                            remaining = timeout - elapsed
-                            if remaining <= 0:
-                                spinner.fail('Listening timeout')
-                                return None
-                                
-                            spinner.text = f'Listening... ({remaining:.1f}s remaining)'
-                            
-                            # Try to get audio with a short timeout
-                            audio = self.recognizer.listen(source, timeout=1)
-                            if audio:
-                                spinner.succeed('Audio captured successfully')
-                                break
-                                
-                        except sr.WaitTimeoutError:
-                            continue
-                            
-                if not audio:
+            # This thread sleeps until a phrase arrives, Esc is pressed or
+            # nobody starts speaking in time
+            capture_thread = threading.Thread(target=capture, daemon=True)
+            capture_thread.start()
+            with Halo(text=f'Listening... (start speaking within {timeout}s)', spinner='dots') as spinner:
+                self.interrupted.wait()
+                if errors:
+                    raise errors[0]
+                if phrases:
+                    audio = self._downsample(phrases[0])
+                    spinner.succeed('Audio captured successfully')
+                elif timed_out.is_set():
+                    spinner.fail('Listening timeout')
                     return None
+                else:
+                    spinner.fail('Listening cancelled')
+                    return None
+                
+            # Noise can trip the energy threshold; don't send it off to be transcribed
+            if not self._has_speech(audio):
+                print(f"{Fore.YELLOW}No speech detected{Style.RESET_ALL}")
+                return None
+            
+            # Try to recognize speech
+            with Halo(text='Processing speech...', spinner='dots') as spinner:
+                for attempt in range(MAX_RETRIES):
+                    try:
+                        # Try Google Speech Recognition
+                        google_limiter.acquire()
+                        text = self.recognizer.recognize_google(audio)
+                        spinner.succeed('Speech processed successfully')
+                        return text
                     
-                # Try to recognize speech
-                with Halo(text='Processing speech...', spinner='dots') as spinner:
-                    for attempt in range(MAX_RETRIES):
+                    except sr.RequestError:
+                        # Try offline recognition
                         try:
-                            # Try Google Speech Recognition
-                            text = self.recognizer.recognize_google(audio)
-                            spinner.succeed('Speech processed successfully')
-                            return text
-                            
-                        except sr.RequestError:
-                            # Try offline recognition
-                            if self.offline_engine:
-                                try:
-                                    text = self.offline_engine.decode(audio.get_raw_data())
-                                    spinner.succeed('Speech processed offline')
-                                    return text
-                                except Exception:
-                                    pass
-                                    
-                            if attempt < MAX_RETRIES - 1:
-                                spinner.text = f'Retrying... ({attempt + 1}/{MAX_RETRIES})'
-                                time.sleep(RETRY_DELAY)
-                            else:
-                                spinner.fail('Speech recognition failed')
-                                print(f"{Fore.RED}Error: Could not connect to speech recognition service{Style.RESET_ALL}")
-                                return None
+                            text = self._recognize_offline(audio)
+                            if text is not None:
+                                spinner.succeed('Speech processed offline')
+                                return text
+                        except Exception:
+                            pass
                                 
-                        except sr.UnknownValueError:
-                            spinner.fail('Speech not understood')
-                            print(f"{Fore.YELLOW}Could not understand audio{Style.RESET_ALL}")
+                        if attempt < MAX_RETRIES - 1:
+                            spinner.text = f'Retrying... ({attempt + 1}/{MAX_RETRIES})'
+                            time.sleep(RETRY_DELAY)
+                        else:
+                            spinner.fail('Speech recognition failed')
+                            print(f"{Fore.RED}Error: Could not connect to speech recognition service{Style.RESET_ALL}")
                             return None
                             
+                    except sr.UnknownValueError:
+                        spinner.fail('Speech not understood')
+                        print(f"{Fore.YELLOW}Could not understand audio{Style.RESET_ALL}")
+                        return None
+        
         except Exception as e:
             print(f"{Fore.RED}Error during speech recognition: {str(e)}{Style.RESET_ALL}")
             return None
@@ -158,71 +308,116 @@ class STTManager:
     def cleanup(self):
         """Clean up resources."""
         try:
-            if self.offline_engine:
-                self.offline_engine.cleanup()
+            keyboard.remove_hotkey(self.hotkey)
         except Exception as e:
             print(f"{Fore.YELLOW}Warning: Error during cleanup: {str(e)}{Style.RESET_ALL}")
             
     def stream_audio(self, callback: Optional[Callable[[str], None]] = None) -> None:
         """Stream audio and transcribe in real-time with rich display."""
+        # Phrases are transcribed off the listener thread so capture continues
+        # during each request; a single worker keeps transcripts in order
+        recognition = ThreadPoolExecutor(max_workers=1)
+        stop_listening = None
         try:
+            # Esc stops the stream through the queue (see _on_escape), so the
+            # display loop can block on the next transcript
             self.streaming = True
             print(f"\n{Fore.CYAN}Starting audio stream... Press 'Esc' to stop.{Style.RESET_ALL}")
             
-            def audio_callback(recognizer, audio):
-                """Callback for handling audio data."""
+            # Bound once here rather than looked up on every phrase
+            put = self.stream_queue.put
+            recognize_google = self.recognizer.recognize_google
+            submit = recognition.submit
+
+            def recognize(audio, final):
+                """Transcribe one captured phrase and queue the result."""
+                audio = self._downsample(audio)
                 try:
-                    text = recognizer.recognize_google(audio)
-                    self.stream_queue.put(("text", text))
+                    if self._has_speech(audio):
+                        google_limiter.acquire()
+                        put(("text" if final else "partial", recognize_google(audio)))
+                        return
                 except sr.UnknownValueError:
-                    self.stream_queue.put(("error", "Could not understand audio"))
+                    put(UNRECOGNIZED)
                 except sr.RequestError as e:
-                    self.stream_queue.put(("error", f"Service error: {e}"))
+                    put(("error", f"Service error: {e}"))
                 except Exception as e:
-                    self.stream_queue.put(("error", f"Error: {e}"))
+                    put(("error", f"Error: {e}"))
+                # Nothing was transcribed, but what was said before still ends here
+                if final:
+                    put(("end", None))
+
+            def audio_callback(recognizer, audio):
+                """Callback for handling audio data."""
+                # A phrase that ends after Esc is dropped rather than transcribed
+                if self.streaming:
+                    # A phrase cut off at the limit is continued by the next
+                    # one; only a phrase ended by a pause completes the query
+                    duration = len(audio.frame_data) / (audio.sample_rate * audio.sample_width)
+                    submit(recognize, audio, duration < PHRASE_TIME_LIMIT)
 
             # Start background listening
             stop_listening = self.recognizer.listen_in_background(
                 self.microphone,
                 audio_callback,
-                phrase_time_limit=5
+                phrase_time_limit=PHRASE_TIME_LIMIT
             )
 
-            # Display streaming transcription
+            # Display streaming transcription. Pieces are shown as they
+            # arrive, but the callback gets each query once, joined up
             with Live(refresh_per_second=4) as live:
                 live_text = Text()
+                parts = []
+                last_part = 0.0
+                
+                def finish_query():
+                    """Hand the joined pieces of one query to the callback."""
+                    if parts and callback:
+                        callback(" ".join(parts))
+                    parts.clear()
+                
                 while self.streaming:
                     try:
-                        if keyboard.is_pressed('esc'):
+                        try:
+                            msg_type, content = self.stream_queue.get(timeout=STREAM_POLL_INTERVAL)
+                        except queue.Empty:
+                            # Speech stopped right at the limit, so no phrase
+                            # ended by a pause will follow
+                            if parts and time.monotonic() - last_part > PHRASE_TIME_LIMIT + PAUSE_THRESHOLD:
+                                finish_query()
+                            continue
+
+                        if msg_type == "stop":
                             self.streaming = False
                             break
-
-                        try:
-                            msg_type, content = self.stream_queue.get_nowait()
+                        elif msg_type in ("text", "partial"):
+                            live_text.append(f"\n{content}")
+                            parts.append(content)
+                            last_part = time.monotonic()
                             if msg_type == "text":
-                                live_text.append(f"\n{content}")
-                                if callback:
-                                    callback(content)
-                            elif msg_type == "error":
-                                live_text.append(f"\n{Fore.YELLOW}{content}{Style.RESET_ALL}")
-                        except queue.Empty:
-                            pass
+                                finish_query()
+                        elif msg_type == "end":
+                            finish_query()
+                        elif msg_type == "error":
+                            live_text.append(f"\n{Fore.YELLOW}{content}{Style.RESET_ALL}")
 
                         live.update(live_text)
-                        time.sleep(0.1)
 
                     except Exception as e:
                         print(f"{Fore.RED}Error in streaming loop: {str(e)}{Style.RESET_ALL}")
                         break
 
-            # Stop background listening
-            stop_listening(wait_for_stop=False)
             print(f"\n{Fore.GREEN}Streaming stopped.{Style.RESET_ALL}")
 
         except Exception as e:
             print(f"{Fore.RED}Error in audio streaming: {str(e)}{Style.RESET_ALL}")
         finally:
             self.streaming = False
+            # Wait for the listener thread to exit so no phrase can be
+            # submitted to the executor after it shuts down
+            if stop_listening:
+                stop_listening(wait_for_stop=True)
+            recognition.shutdown(wait=False)
 
 def test_microphone() -> bool:
     """Test microphone functionality."""
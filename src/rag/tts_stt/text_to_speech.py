@@ -1,179 +1,653 @@
 """Text-to-Speech functionality with caching and performance optimizations."""
 
 import os
+import re
+import atexit
+import sys
 import json
 import hashlib
 import shutil
+import sqlite3
+import subprocess
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Dict
+from typing import Callable, Iterator, Optional, Dict
 from dotenv import load_dotenv
-from elevenlabs import generate, play, set_api_key, voices
+from elevenlabs import play, set_api_key, stream, voices
+import httpx
 from colorama import Fore, Style
 from halo import Halo
+from prompt_toolkit.shortcuts import radiolist_dialog
 import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from .rate_limit import TokenBucket
 
-# Load environment variables
+# Load environment variables and configure the elevenlabs client once
 load_dotenv()
+API_KEY = os.getenv("ELEVENLABS_API_KEY")
+if API_KEY:
+    set_api_key(API_KEY)
 
 # Constants
 CACHE_DIR = Path("cache/tts")
+VOICES_FILE = CACHE_DIR / "voices.json"  # Voice list saved for later runs
 MAX_CACHE_SIZE_MB = int(os.getenv("TTS_CACHE_SIZE", "100"))  # Maximum cache size in MB
+MEMORY_CACHE_MB = int(os.getenv("TTS_MEMORY_CACHE_SIZE", "32"))  # Recently played audio kept in RAM, in MB
 MAX_RETRIES = 3
 RETRY_DELAY = 2
+VOICES_TTL = 3600  # Seconds the voice list is reused before asking the API again
+VOICES_RETRY_DELAY = 60  # Seconds after a failed voices() call before trying it again
+TTS_CONCURRENCY = int(os.getenv("TTS_CONCURRENCY", "3"))  # Sentences generated ahead of playback at once
+PRELOAD_PHRASES = ("Thinking...", "Yes.", "No.", "Done.")  # Generated once and never evicted
+SENTENCE_END = re.compile(r"[.!?](?=\s)|\n")
+ELEVENLABS_API_URL = "https://api.elevenlabs.io/v1/text-to-speech"
+ELEVENLABS_MODEL = os.getenv("ELEVENLABS_MODEL", "eleven_monolingual_v1")
+DEFAULT_VOICE_IDS = {"Bella": "EXAVITQu4vr4xnSDxMaL"}  # Premade voices usable before voices() answers
+FFPLAY = shutil.which("ffplay")  # Plays cached files straight from disk when installed
+MPV = shutil.which("mpv")  # Needed by elevenlabs.stream() to play audio as it arrives
+
+# Shared HTTP/2 connection pool so every synthesis request reuses an open
+# TLS connection instead of negotiating a new one
+http_client = httpx.Client(
+    http2=True,
+    limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=60),
+    timeout=httpx.Timeout(30.0, connect=5.0)
+)
+
+# Shared by every manager and streamer so bursts of sentences stay under
+# the ElevenLabs request rate instead of failing into retry sleeps
+elevenlabs_limiter = TokenBucket(rate=2, burst=4)
+
+# Generated audio is written to the cache off the playback path
+cache_writer = ThreadPoolExecutor(max_workers=1)
+
+# Audio currently being generated, by cache key, so identical concurrent
+# requests share one API call instead of each making their own
+inflight_requests: Dict[str, Future] = {}
+inflight_lock = threading.Lock()
+
+# Recently played audio by cache key, least recently used first, so repeated
+# prompts are served without reading the cache file again
+audio_memory: "OrderedDict[str, bytes]" = OrderedDict()
+audio_memory_size = 0
+audio_memory_lock = threading.Lock()
+
+# Voice IDs by name from the last successful voices() call, when it was
+# made, and when a call last failed
+voices_cache = {"ids": None, "fetched_at": 0.0, "failed_at": 0.0}
+voices_lock = threading.Lock()
+
+class _NullSpinner:
+    """Stand-in for Halo when stdout is not a terminal.
+    
+    Skips the repaint thread and prints only the final result.
+    """
+    
+    def __init__(self, text: str = ""):
+        self.text = text
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        return False
+    
+    def succeed(self, text: Optional[str] = None):
+        print(f"{Fore.GREEN}{text or self.text}{Style.RESET_ALL}")
+    
+    def fail(self, text: Optional[str] = None):
+        print(f"{Fore.RED}{text or self.text}{Style.RESET_ALL}")
+
+def _spinner(text: str):
+    """Return a Halo spinner, or a _NullSpinner when output isn't a terminal."""
+    if sys.stdout.isatty():
+        return Halo(text=text, spinner="dots")
+    return _NullSpinner(text)
+
+@lru_cache(maxsize=512)
+def _cache_key(text: str, voice: str) -> str:
+    """Hash text and voice into a cache key, remembering recent prompts."""
+    # Hashes the same bytes as f"{text}:{voice}", so existing cache files
+    # keep their names, without building the joined string first
+    digest = hashlib.blake2b(text.encode(), digest_size=16)
+    digest.update(b":")
+    digest.update(voice.encode())
+    return digest.hexdigest()
+
+def _release_request(cache_key: str):
+    with inflight_lock:
+        inflight_requests.pop(cache_key, None)
+
+def _play_file(path: Path):
+    """Play an audio file, letting ffplay read it from disk when installed."""
+    if FFPLAY:
+        try:
+            subprocess.run(
+                [FFPLAY, "-autoexit", "-nodisp", "-loglevel", "quiet", str(path)],
+                check=True
+            )
+            return
+        except (OSError, subprocess.CalledProcessError):
+            # ffplay without a usable audio device; the elevenlabs player may still work
+            pass
+    play(path.read_bytes())
+
+def _recall_audio(cache_key: str) -> Optional[bytes]:
+    with audio_memory_lock:
+        audio = audio_memory.get(cache_key)
+        if audio is not None:
+            audio_memory.move_to_end(cache_key)
+        return audio
+
+def _remember_audio(cache_key: str, audio: bytes):
+    global audio_memory_size
+    limit = MEMORY_CACHE_MB * 1024 * 1024
+    if len(audio) > limit:
+        return
+    with audio_memory_lock:
+        previous = audio_memory.pop(cache_key, None)
+        if previous is not None:
+            audio_memory_size -= len(previous)
+        audio_memory[cache_key] = audio
+        audio_memory_size += len(audio)
+        while audio_memory_size > limit:
+            _, evicted = audio_memory.popitem(last=False)
+            audio_memory_size -= len(evicted)
 
 class TTSManager:
     def __init__(self):
         """Initialize TTS manager with caching."""
-        self.api_key = os.getenv("ELEVENLABS_API_KEY")
+        self.api_key = API_KEY
         if not self.api_key:
             raise ValueError("ELEVENLABS_API_KEY not found in environment variables")
             
-        set_api_key(self.api_key)
         self.cache_dir = CACHE_DIR
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.cache_lock = threading.Lock()
-        self.cache_info = self._load_cache_info()
+        self.db = self._open_cache_db()
+        # Files to pin as soon as they are written (see preload)
+        self.pinned_names = set()
+        # Running total of cached bytes, kept in step with the index
+        self.cache_size = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
         
-    def _load_cache_info(self) -> Dict:
-        """Load cache information from disk."""
-        cache_info_file = self.cache_dir / "cache_info.json"
-        if cache_info_file.exists():
-            try:
-                with open(cache_info_file, "r") as f:
-                    return json.load(f)
-            except Exception as e:
-                print(f"{Fore.YELLOW}Warning: Could not load cache info: {str(e)}{Style.RESET_ALL}")
-        return {"files": {}, "total_size": 0}
+    def _open_cache_db(self) -> sqlite3.Connection:
+        """Open the SQLite cache index, creating it if needed.
         
-    def _save_cache_info(self):
-        """Save cache information to disk."""
+        Each cached file has one row with its size, when it was last used
+        and whether it is pinned, so inserts, hits and evictions only touch
+        the rows involved.
+        """
+        db = sqlite3.connect(str(self.cache_dir / "cache.db"), check_same_thread=False)
+        # WAL lets other processes read while we write, and NORMAL only syncs
+        # at checkpoints; a crash can lose the last touches but not corrupt it
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "name TEXT PRIMARY KEY, size INTEGER NOT NULL, last_used REAL NOT NULL, "
+            "pinned INTEGER NOT NULL DEFAULT 0)"
+        )
+        # Indexes created before pinning existed lack the column
+        if "pinned" not in {row[1] for row in db.execute("PRAGMA table_info(cache)")}:
+            db.execute("ALTER TABLE cache ADD COLUMN pinned INTEGER NOT NULL DEFAULT 0")
+        db.execute("CREATE INDEX IF NOT EXISTS cache_last_used ON cache (last_used)")
+        db.commit()
+        self._migrate_json_index(db)
+        return db
+        
+    def _migrate_json_index(self, db: sqlite3.Connection):
+        """Import the JSON index used by earlier versions once, then remove it."""
+        index_file = self.cache_dir / "cache_info.json"
+        journal_file = self.cache_dir / "cache_info.log"
+        if not index_file.exists() and not journal_file.exists():
+            return
+        
+        files = OrderedDict()
         try:
-            with open(self.cache_dir / "cache_info.json", "w") as f:
-                json.dump(self.cache_info, f)
+            if index_file.exists():
+                with open(index_file, "r") as f:
+                    entries = json.load(f).get("files", {}).items()
+                # Least recently used first; the oldest indexes kept timestamps
+                files.update(sorted(entries, key=lambda x: x[1].get("timestamp", 0)))
+            if journal_file.exists():
+                with open(journal_file, "r") as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            break
+                        name = record["name"]
+                        if record["op"] == "touch":
+                            if name in files:
+                                files.move_to_end(name)
+                        elif record["op"] == "del":
+                            files.pop(name, None)
+                        else:
+                            files.pop(name, None)
+                            files[name] = {"size": record["size"]}
+            
+            # Keep the old recency order in the new last_used column
+            now = time.time()
+            db.executemany(
+                "INSERT OR IGNORE INTO cache (name, size, last_used) VALUES (?, ?, ?)",
+                [(name, info["size"], now - len(files) + i) for i, (name, info) in enumerate(files.items())]
+            )
+            db.commit()
+            index_file.unlink(missing_ok=True)
+            journal_file.unlink(missing_ok=True)
         except Exception as e:
-            print(f"{Fore.YELLOW}Warning: Could not save cache info: {str(e)}{Style.RESET_ALL}")
+            print(f"{Fore.YELLOW}Warning: Could not migrate cache info: {str(e)}{Style.RESET_ALL}")
             
     def _get_cache_key(self, text: str, voice: str) -> str:
         """Generate cache key for text and voice combination."""
-        return hashlib.md5(f"{text}:{voice}".encode()).hexdigest()
+        return _cache_key(text, voice)
         
     def _manage_cache_size(self):
-        """Ensure cache doesn't exceed maximum size."""
+        """Ensure cache doesn't exceed maximum size.
+        
+        The caller must hold cache_lock.
+        """
+        limit = MAX_CACHE_SIZE_MB * 1024 * 1024
+        if self.cache_size <= limit:
+            return
+        
+        # Pick least recently used files until enough space is freed, reading
+        # only as far into the index as needed, then remove them in one go
+        overflow = self.cache_size - limit
+        victims = []
+        freed = 0
+        for oldest_file, size in self.db.execute(
+            "SELECT name, size FROM cache WHERE pinned = 0 ORDER BY last_used"
+        ):
+            if freed >= overflow:
+                break
+            victims.append((oldest_file,))
+            freed += size
+        self.db.executemany("DELETE FROM cache WHERE name = ?", victims)
+        self.db.commit()
+        self.cache_size -= freed
+        
+        cache_dir = str(self.cache_dir)
+        for (oldest_file,) in victims:
+            try:
+                os.unlink(os.path.join(cache_dir, oldest_file))
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"{Fore.YELLOW}Warning: Error removing cache file: {str(e)}{Style.RESET_ALL}")
+            
+    def _store_in_cache(self, cache_file: Path, audio: bytes):
+        """Write generated audio to the cache and record it in the index."""
+        try:
+            # A file is only visible under its final name once complete, so
+            # readers never need the lock to see it whole and a crash mid-write
+            # can't leave a truncated hit behind. Writes all come from the one
+            # cache_writer thread, so the lock only has to cover the index.
+            partial = cache_file.with_suffix(".mp3.tmp")
+            partial.write_bytes(audio)
+            os.replace(partial, cache_file)
+            file_size = len(audio)
+            with self.cache_lock:
+                previous = self.db.execute(
+                    "SELECT size FROM cache WHERE name = ?", (cache_file.name,)
+                ).fetchone()
+                self.cache_size += file_size - (previous[0] if previous else 0)
+                # Upsert rather than replace so a pinned entry stays pinned
+                self.db.execute(
+                    "INSERT INTO cache (name, size, last_used, pinned) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(name) DO UPDATE SET size = excluded.size, last_used = excluded.last_used, "
+                    "pinned = MAX(pinned, excluded.pinned)",
+                    (cache_file.name, file_size, time.time(), int(cache_file.name in self.pinned_names))
+                )
+                self.db.commit()
+                self._manage_cache_size()
+        except Exception as e:
+            print(f"{Fore.YELLOW}Warning: Could not cache audio: {str(e)}{Style.RESET_ALL}")
+    
+    def _cached_audio(self, cache_key: str, cache_file: Path) -> Optional[bytes]:
+        """Return cached audio and record the hit, or None if it is not cached."""
+        # Memory before disk; the file is read outside the lock so lookups
+        # for other prompts aren't held up behind it
+        audio = _recall_audio(cache_key)
+        if audio is None:
+            try:
+                audio = cache_file.read_bytes()
+            except FileNotFoundError:
+                return None
+            _remember_audio(cache_key, audio)
+        self._touch(cache_file)
+        return audio
+    
+    def _pin(self, cache_file: Path):
+        """Exclude a cached file from eviction."""
         with self.cache_lock:
-            while self.cache_info["total_size"] > MAX_CACHE_SIZE_MB * 1024 * 1024:
-                # Remove oldest files until under limit
-                oldest_file = min(
-                    self.cache_info["files"].items(),
-                    key=lambda x: x[1]["timestamp"]
-                )[0]
-                
-                try:
-                    file_path = self.cache_dir / oldest_file
-                    if file_path.exists():
-                        file_size = file_path.stat().st_size
-                        file_path.unlink()
-                        self.cache_info["total_size"] -= file_size
-                        del self.cache_info["files"][oldest_file]
-                except Exception as e:
-                    print(f"{Fore.YELLOW}Warning: Error removing cache file: {str(e)}{Style.RESET_ALL}")
-                    
-            self._save_cache_info()
+            self.db.execute("UPDATE cache SET pinned = 1 WHERE name = ?", (cache_file.name,))
+            self.db.commit()
+    
+    def preload(self, phrases=PRELOAD_PHRASES, voice: str = "Bella"):
+        """Generate audio for common phrases ahead of time and pin it in the cache."""
+        for phrase in phrases:
+            cache_file = self.cache_dir / f"{self._get_cache_key(phrase, voice)}.mp3"
+            if cache_file.exists():
+                self._pin(cache_file)
+            else:
+                # Pinned when the cache writer stores it
+                self.pinned_names.add(cache_file.name)
+                self.fetch_speech(phrase, voice)
+    
+    def _touch(self, cache_file: Path):
+        """Record a cache hit in the index."""
+        with self.cache_lock:
+            self.db.execute(
+                "UPDATE cache SET last_used = ? WHERE name = ?",
+                (time.time(), cache_file.name)
+            )
+            self.db.commit()
+            
+    def _claim_request(self, cache_key: str):
+        """Return the shared future for a key and whether this caller generates it."""
+        with inflight_lock:
+            pending = inflight_requests.get(cache_key)
+            if pending is not None:
+                return pending, False
+            pending = inflight_requests[cache_key] = Future()
+            return pending, True
             
+    def _publish(self, cache_key: str, cache_file: Path, pending: Future, audio: bytes):
+        """Hand new audio to waiting requests and to the cache writer."""
+        if pending.done():
+            return
+        pending.set_result(audio)
+        _remember_audio(cache_key, audio)
+        # Keep sharing the audio until it can be found in the cache
+        cache_writer.submit(self._store_in_cache, cache_file, audio).add_done_callback(
+            lambda _: _release_request(cache_key)
+        )
+        
     def generate_speech(self, text: str, voice: str = "Bella") -> bool:
         """Generate speech from text with caching and error handling."""
         try:
             cache_key = self._get_cache_key(text, voice)
             cache_file = self.cache_dir / f"{cache_key}.mp3"
             
-            # Check cache first
-            with self.cache_lock:
-                if cache_file.exists():
-                    print(f"{Fore.GREEN}Using cached audio{Style.RESET_ALL}")
-                    play(cache_file.read_bytes())
-                    return True
-                    
-            # Generate new audio
-            with Halo(text="Generating speech...", spinner="dots") as spinner:
+            # Check cache first. A file not already in memory is handed to the
+            # player by path rather than copied into a bytes object first
+            if _recall_audio(cache_key) is None and FFPLAY and cache_file.exists():
+                self._touch(cache_file)
+                print(f"{Fore.GREEN}Using cached audio{Style.RESET_ALL}")
+                _play_file(cache_file)
+                return True
+            audio = self._cached_audio(cache_key, cache_file)
+            if audio is not None:
+                print(f"{Fore.GREEN}Using cached audio{Style.RESET_ALL}")
+                play(audio)
+                return True
+                
+            # Share the result of an identical request already generating
+            pending, is_leader = self._claim_request(cache_key)
+            if not is_leader:
+                audio = pending.result()
+                if audio is None:
+                    return False
+                print(f"{Fore.GREEN}Using audio from an identical request{Style.RESET_ALL}")
+                play(audio)
+                return True
+            
+            try:
+                return self._generate_and_play(
+                    text, voice, lambda audio: self._publish(cache_key, cache_file, pending, audio)
+                )
+            finally:
+                if not pending.done():
+                    pending.set_result(None)
+                    _release_request(cache_key)
+        
+        except Exception as e:
+            print(f"{Fore.RED}Error generating speech: {str(e)}{Style.RESET_ALL}")
+            return False
+            
+    def fetch_speech(self, text: str, voice: str = "Bella") -> Optional[bytes]:
+        """Return the audio for text without playing it, generating it if needed."""
+        try:
+            cache_key = self._get_cache_key(text, voice)
+            cache_file = self.cache_dir / f"{cache_key}.mp3"
+            
+            audio = self._cached_audio(cache_key, cache_file)
+            if audio is not None:
+                return audio
+            
+            pending, is_leader = self._claim_request(cache_key)
+            if not is_leader:
+                return pending.result()
+            
+            try:
                 for attempt in range(MAX_RETRIES):
                     try:
-                        audio = generate(text=text, voice=voice)
-                        
-                        # Save to cache
-                        with self.cache_lock:
-                            cache_file.write_bytes(audio)
-                            file_size = cache_file.stat().st_size
-                            self.cache_info["files"][cache_file.name] = {
-                                "timestamp": time.time(),
-                                "size": file_size
-                            }
-                            self.cache_info["total_size"] += file_size
-                            self._manage_cache_size()
-                            
-                        # Play audio
-                        play(audio)
-                        spinner.succeed("Speech generated successfully")
-                        return True
-                        
+                        elevenlabs_limiter.acquire()
+                        audio = self._request_speech(text, voice)
+                        break
                     except Exception as e:
                         if attempt == MAX_RETRIES - 1:
-                            spinner.fail(f"Failed to generate speech: {str(e)}")
-                            return False
+                            raise
                         print(f"{Fore.YELLOW}Retry {attempt + 1}/{MAX_RETRIES}: {str(e)}{Style.RESET_ALL}")
                         time.sleep(RETRY_DELAY)
-                        
+                self._publish(cache_key, cache_file, pending, audio)
+                return audio
+            finally:
+                if not pending.done():
+                    pending.set_result(None)
+                    _release_request(cache_key)
+        
         except Exception as e:
             print(f"{Fore.RED}Error generating speech: {str(e)}{Style.RESET_ALL}")
-            return False
+            return None
             
+    def _request_speech(self, text: str, voice: str) -> bytes:
+        """Generate the complete audio for text over the shared connection pool."""
+        response = http_client.post(
+            f"{ELEVENLABS_API_URL}/{_voice_id(voice)}",
+            headers={"xi-api-key": self.api_key},
+            json={"text": text, "model_id": ELEVENLABS_MODEL}
+        )
+        response.raise_for_status()
+        return response.content
+    
+    def _stream_speech(self, text: str, voice: str) -> Iterator[bytes]:
+        """Yield audio for text as the API produces it."""
+        with http_client.stream(
+            "POST",
+            f"{ELEVENLABS_API_URL}/{_voice_id(voice)}/stream",
+            headers={"xi-api-key": self.api_key},
+            json={"text": text, "model_id": ELEVENLABS_MODEL}
+        ) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes():
+                if chunk:
+                    yield chunk
+    
+    def _generate_and_play(self, text: str, voice: str, on_audio: Callable[[bytes], None]) -> bool:
+        """Generate and play new audio with retries.
+        
+        on_audio is called with the complete audio as soon as it is available.
+        """
+        with _spinner("Generating speech...") as spinner:
+            for attempt in range(MAX_RETRIES):
+                try:
+                    elevenlabs_limiter.acquire()
+                    if MPV:
+                        # Start playing as soon as the first chunk arrives;
+                        # stream() returns the complete audio once done
+                        on_audio(stream(self._stream_speech(text, voice)))
+                    else:
+                        # Without mpv, cache and share the audio while it plays
+                        audio = self._request_speech(text, voice)
+                        on_audio(audio)
+                        play(audio)
+                    spinner.succeed("Speech generated successfully")
+                    return True
+                
+                except Exception as e:
+                    if attempt == MAX_RETRIES - 1:
+                        spinner.fail(f"Failed to generate speech: {str(e)}")
+                        return False
+                    print(f"{Fore.YELLOW}Retry {attempt + 1}/{MAX_RETRIES}: {str(e)}{Style.RESET_ALL}")
+                    time.sleep(RETRY_DELAY)
+    
     def get_available_voices(self) -> list:
         """Get list of available voices with error handling."""
-        try:
-            return [voice.name for voice in voices()]
-        except Exception as e:
-            print(f"{Fore.RED}Error getting voices: {str(e)}{Style.RESET_ALL}")
-            return ["Bella"]  # Return default voice as fallback
+        return get_available_voices()
             
     def cleanup(self):
         """Clean up resources."""
         try:
-            # Save final cache state
-            self._save_cache_info()
+            # Index changes are committed as they are made
+            with self.cache_lock:
+                self.db.commit()
         except Exception as e:
             print(f"{Fore.YELLOW}Warning: Error during cleanup: {str(e)}{Style.RESET_ALL}")
             
+def get_available_voices() -> list:
+    """Get list of available voices, reusing the last answer for VOICES_TTL seconds.
+    
+    After a failed request the stale list (or the default voice) is used for
+    VOICES_RETRY_DELAY seconds instead of asking the API on every synthesis.
+    """
+    with voices_lock:
+        if voices_cache["ids"] is None:
+            _load_saved_voices()
+        now = time.time()
+        if voices_cache["ids"] is not None and now - voices_cache["fetched_at"] < VOICES_TTL:
+            return list(voices_cache["ids"])
+        if now - voices_cache["failed_at"] < VOICES_RETRY_DELAY:
+            return list(voices_cache["ids"] or ["Bella"])
+    try:
+        ids = {voice.name: voice.voice_id for voice in voices()}
+    except Exception as e:
+        print(f"{Fore.RED}Error getting voices: {str(e)}{Style.RESET_ALL}")
+        with voices_lock:
+            voices_cache["failed_at"] = time.time()
+            return list(voices_cache["ids"] or ["Bella"])  # Stale list, or the default voice
+    with voices_lock:
+        voices_cache["ids"] = ids
+        voices_cache["fetched_at"] = time.time()
+    _save_voices(ids)
+    return list(ids)
+
+def _load_saved_voices():
+    """Fill the voice cache from the last run's list. The caller must hold voices_lock."""
+    try:
+        fetched_at = VOICES_FILE.stat().st_mtime
+        with open(VOICES_FILE, "r") as f:
+            voices_cache["ids"] = json.load(f)
+        voices_cache["fetched_at"] = fetched_at
+    except (OSError, ValueError):
+        pass
+
+def _save_voices(ids: Dict[str, str]):
+    """Save the voice list so later runs can skip the voices() request."""
+    try:
+        VOICES_FILE.parent.mkdir(parents=True, exist_ok=True)
+        partial = VOICES_FILE.with_suffix(".json.tmp")
+        with open(partial, "w") as f:
+            json.dump(ids, f)
+        os.replace(partial, VOICES_FILE)
+    except OSError as e:
+        print(f"{Fore.YELLOW}Warning: Could not save voice list: {str(e)}{Style.RESET_ALL}")
+
+def _voice_id(voice: str) -> str:
+    """Resolve a voice name to its ID; values that aren't known names are used as IDs."""
+    get_available_voices()
+    with voices_lock:
+        ids = voices_cache["ids"] or {}
+    return ids.get(voice) or DEFAULT_VOICE_IDS.get(voice, voice)
+
+# Manager shared by the convenience functions so the cache index is opened
+# once per process; created on first use
+default_manager: Optional["TTSManager"] = None
+default_manager_lock = threading.Lock()
+
+def _default_manager() -> "TTSManager":
+    """Return the shared TTSManager, creating it on first use."""
+    global default_manager
+    with default_manager_lock:
+        if default_manager is None:
+            default_manager = TTSManager()
+            atexit.register(default_manager.cleanup)
+            threading.Thread(target=default_manager.preload, daemon=True).start()
+        return default_manager
+
 def read_text_aloud(text: str, voice: Optional[str] = None) -> bool:
     """Convenience function to read text aloud."""
-    try:
-        manager = TTSManager()
-        return manager.generate_speech(text, voice or "Bella")
-    finally:
-        if 'manager' in locals():
-            manager.cleanup()
+    return _default_manager().generate_speech(text, voice or "Bella")
             
+class SentenceStreamer:
+    """Speak streamed text sentence by sentence while it is still arriving."""
+    
+    def __init__(self, voice: Optional[str] = None):
+        self.voice = voice
+        self.buffer = ""
+        self.sentences = 0
+        # Later sentences are generated concurrently while earlier ones play;
+        # a single player keeps them in the order they were dispatched
+        self.generator = ThreadPoolExecutor(max_workers=TTS_CONCURRENCY)
+        self.player = ThreadPoolExecutor(max_workers=1)
+    
+    def _fetch(self, sentence: str) -> Optional[bytes]:
+        """Generate audio for a sentence on a generator thread."""
+        return _default_manager().fetch_speech(sentence, self.voice or "Bella")
+    
+    def _play(self, audio: Future) -> None:
+        """Play a sentence's audio once it has been generated."""
+        try:
+            data = audio.result()
+            if data:
+                play(data)
+        except Exception as e:
+            print(f"{Fore.RED}Error playing speech: {str(e)}{Style.RESET_ALL}")
+    
+    def _speak(self, sentence: str) -> None:
+        """Queue a sentence for speech."""
+        if self.sentences == 0:
+            # Nothing is playing yet, so stream the first sentence directly
+            self.player.submit(read_text_aloud, sentence, self.voice)
+        else:
+            self.player.submit(self._play, self.generator.submit(self._fetch, sentence))
+        self.sentences += 1
+    
+    def feed(self, text: str) -> None:
+        """Add streamed text, dispatching any completed sentences for speech."""
+        self.buffer += text
+        end = None
+        for match in SENTENCE_END.finditer(self.buffer):
+            end = match.end()
+        if end is None:
+            return
+        sentence, self.buffer = self.buffer[:end], self.buffer[end:]
+        if sentence.strip():
+            self._speak(sentence.strip())
+    
+    def close(self) -> None:
+        """Speak any remaining text and release the workers once they finish."""
+        if self.buffer.strip():
+            self._speak(self.buffer.strip())
+        self.buffer = ""
+        self.generator.shutdown(wait=False)
+        self.player.shutdown(wait=False)
+
 def select_voice() -> Optional[str]:
     """Select a voice interactively."""
     try:
-        manager = TTSManager()
-        voices = manager.get_available_voices()
+        voices = get_available_voices()
         
-        print(f"\n{Fore.CYAN}Available voices:{Style.RESET_ALL}")
-        for i, voice in enumerate(voices, 1):
-            print(f"{i}. {voice}")
-            
-        while True:
-            try:
-                choice = input(f"\n{Fore.GREEN}Select a voice (1-{len(voices)}): {Style.RESET_ALL}")
-                index = int(choice) - 1
-                if 0 <= index < len(voices):
-                    return voices[index]
-                print(f"{Fore.RED}Invalid choice. Please try again.{Style.RESET_ALL}")
-            except ValueError:
-                print(f"{Fore.RED}Invalid input. Please enter a number.{Style.RESET_ALL}")
-                
+        # Arrow keys to move, Enter to confirm; returns None if cancelled
+        return radiolist_dialog(
+            title="Available voices",
+            text="Select a voice:",
+            values=[(voice, voice) for voice in voices]
+        ).run()
+    
     except Exception as e:
         print(f"{Fore.RED}Error selecting voice: {str(e)}{Style.RESET_ALL}")
-        return None
-    finally:
-        if 'manager' in locals():
-            manager.cleanup() 
\ No newline at end of file
+        return None 
\ No newline at end of file
@@ -2,20 +2,57 @@
 
 import os
 import json
+import atexit
 import time
+import math
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from pathlib import Path, PurePath
 from typing import Dict, List, Tuple, Optional
 from colorama import init, Fore, Style
+import httpx
 import openai
 from dotenv import load_dotenv
 from ..file_traversal.analyzer import CodeAnalyzer
 
-# Initialize colorama
-init()
-
 # Load environment variables
 load_dotenv()
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "5"))  # Summary requests in flight at once
+SUMMARY_CACHE_FILE = Path.home() / ".cache" / "code-inspector" / "summaries.sqlite"  # Summaries reused across runs
+SUMMARY_CACHE_ENABLED = os.getenv("SUMMARY_CACHE", "1").lower() not in ("0", "false", "no")  # Set SUMMARY_CACHE=0 to always call the API
+SUMMARY_TEMPERATURE = 0.5
+SYSTEM_PROMPT = "You are a technical documentation expert that creates detailed and accurate code summaries."
+PACK_MAX_FILES = int(os.getenv("SUMMARY_PACK_FILES", "3"))  # Small files summarized per request; 1 disables packing
+PACK_TOKEN_BUDGET = 6000  # Estimated prompt tokens of file content per combined request
+PROMPT_ESTIMATE_MARGIN = 1.25  # Padding on prompt estimates when fitting a request into a context window
+SUMMARY_MIN_TOKENS = 512  # Room for every section of the summary even for tiny files
+ANALYSIS_CACHE_SIZE = 4096  # Static analysis results kept for unchanged files
+SUMMARY_RPM = int(os.getenv("SUMMARY_RPM", "500"))  # Requests per minute allowed by the account's rate limit
+SUMMARY_TPM = int(os.getenv("SUMMARY_TPM", "200000"))  # Tokens per minute allowed by the account's rate limit
+BATCH_POLL_INTERVAL = 30  # Seconds between Batch API status checks
+_SEP = "-" * 10  # Line separating the statistics from the paths in a paths file
+PACKED_PROMPT = (
+    "Summarize each of the {count} code files below separately, following the instructions given with each file. "
+    "Respond with a JSON object of the form "
+    '{{"summaries": [{{"path": "<file path exactly as given>", "summary": "<markdown summary>"}}]}} '
+    "containing one entry per file."
+)
+
+# Connection pool sized to the worker count so concurrent requests each get
+# their own multiplexed HTTP/2 stream instead of queueing for a connection
+http_client = httpx.Client(
+    http2=True,
+    limits=httpx.Limits(max_connections=max(SUMMARY_WORKERS, 16), max_keepalive_connections=max(SUMMARY_WORKERS, 16)),
+    timeout=httpx.Timeout(60.0, connect=10.0)
+)
+atexit.register(http_client.close)
+
+client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client)
 
 # Available models
 MODELS = {
@@ -25,6 +62,105 @@ MODELS = {
     "3": {"name": "gpt-3.5-turbo", "display": "GPT-3.5 Turbo"},
 }
 
+# Context window, output limit and JSON mode support of each model
+MODEL_LIMITS = {
+    "gpt-3.5-turbo": {"context": 16385, "max_output": 4096, "json_mode": True},
+    "gpt-4": {"context": 8192, "max_output": 4096, "json_mode": False},
+    "gpt-4-turbo-preview": {"context": 128000, "max_output": 4096, "json_mode": True},
+}
+DEFAULT_MODEL_LIMITS = {"context": 8192, "max_output": 4096, "json_mode": False}  # Assumed for unlisted models
+
+class SummaryCache:
+    """Persistent store of summaries keyed by a hash of the request that summarizes a file on its own."""
+    
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Summaries are looked up and stored from the worker threads
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, summary TEXT NOT NULL, usage TEXT NOT NULL, ts INTEGER NOT NULL)"
+        )
+        self.db.commit()
+    
+    @staticmethod
+    def make_key(model: str, max_tokens: int, messages: List[Dict]) -> str:
+        """Hash everything that affects the response: model, settings and the full prompt."""
+        request = json.dumps([model, max_tokens, SUMMARY_TEMPERATURE, messages], ensure_ascii=False)
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[Tuple[str, Dict]]:
+        """Return the cached (summary, usage) for a key, or None."""
+        with self.lock:
+            row = self.db.execute("SELECT summary, usage FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return row[0], json.loads(row[1])
+    
+    def set(self, key: str, summary: str, usage: Dict):
+        """Store a summary and the usage of the request that produced it."""
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO cache (key, summary, usage, ts) VALUES (?, ?, ?, ?)",
+                (key, summary, json.dumps(usage), int(time.time()))
+            )
+            self.db.commit()
+
+class RateLimiter:
+    """Keeps requests within per-minute request and token limits, waiting only when a limit would be exceeded."""
+    
+    WINDOW = 60.0  # Seconds covered by the limits
+    
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = deque()  # (timestamp, tokens) of requests sent within the window
+        self.tokens = 0
+        self.lock = threading.Lock()
+    
+    def acquire(self, tokens: int = 0):
+        """Block until a request estimated to use the given tokens can be sent."""
+        # A single request larger than the whole budget still has to go out
+        tokens = min(tokens, self.tpm)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                while self.requests and self.requests[0][0] <= now - self.WINDOW:
+                    self.tokens -= self.requests.popleft()[1]
+                if len(self.requests) < self.rpm and self.tokens + tokens <= self.tpm:
+                    self.requests.append((now, tokens))
+                    self.tokens += tokens
+                    return
+                wait = self.requests[0][0] + self.WINDOW - now
+            time.sleep(wait)
+
+rate_limiter = RateLimiter(SUMMARY_RPM, SUMMARY_TPM)
+
+# CodeAnalyzer keeps per-file state on the instance, so each worker thread
+# reuses its own; results are shared by (path, content digest)
+analyzers = threading.local()
+analysis_cache = OrderedDict()  # (file_path, sha1) -> analysis results, most recently used last
+analysis_lock = threading.Lock()
+
+def open_summary_cache() -> Optional[SummaryCache]:
+    """Open the persistent summary cache, or return None if it is disabled or unavailable."""
+    if not SUMMARY_CACHE_ENABLED:
+        return None
+    try:
+        return SummaryCache(SUMMARY_CACHE_FILE)
+    except (OSError, sqlite3.Error) as e:
+        print(f"{Fore.YELLOW}Summary cache unavailable, continuing without it: {str(e)}{Style.RESET_ALL}")
+        return None
+
+summary_cache = open_summary_cache()
+
+def model_limits(model: str) -> Dict:
+    """Return the context window, output limit and JSON mode support of a model."""
+    return MODEL_LIMITS.get(model, DEFAULT_MODEL_LIMITS)
+
 def print_banner():
     """Print a welcome banner for the tool."""
     banner = """
@@ -37,17 +173,12 @@ def print_banner():
 def validate_openai_model(model_name: str) -> bool:
     """Validate that the OpenAI model exists and is accessible."""
     try:
-        # Test the model with a simple request
-        response = client.chat.completions.create(
-            model=model_name,
-            messages=[{"role": "user", "content": "Test"}],
-            max_tokens=5
-        )
+        # Look the model up rather than running a billed completion
+        model = client.models.retrieve(model_name)
         print(f"\n{Fore.GREEN}✓ OpenAI model '{model_name}' validated successfully{Style.RESET_ALL}")
         print(f"Model details:")
-        print(f"- ID: {response.id}")
-        print(f"- Model: {response.model}")
-        print(f"- Usage: {response.usage.total_tokens} tokens")
+        print(f"- ID: {model.id}")
+        print(f"- Owned by: {model.owned_by}")
         return True
     except Exception as e:
         print(f"\n{Fore.RED}✗ Error validating OpenAI model: {str(e)}{Style.RESET_ALL}")
@@ -99,7 +230,7 @@ def parse_text_paths(file_path: str) -> Tuple[List[str], Dict[str, int]]:
                 continue
         
         # Start collecting paths after the separator
-        if "-" * 10 in line:
+        if _SEP in line:
             in_stats = False
             continue
             
@@ -111,10 +242,10 @@ def parse_text_paths(file_path: str) -> Tuple[List[str], Dict[str, int]]:
     
     return paths, stats
 
-def analyze_paths(paths: List[str]) -> Tuple[Dict[str, List[str]], int, int, int]:
+def analyze_paths(paths: List[str]) -> Tuple[Dict[str, List[str]], int, int, int, int]:
     """
-    Analyze paths and return batches, counts of batches, single files, and empty folders.
-    Returns (batches, batch_count, single_file_count, empty_folder_count)
+    Analyze paths and return batches, counts of batches, single files, empty folders, and README files.
+    Returns (batches, batch_count, single_file_count, empty_folder_count, readme_count)
     """
     batches = {}
     empty_folder_count = 0
@@ -126,7 +257,7 @@ def analyze_paths(paths: List[str]) -> Tuple[Dict[str, List[str]], int, int, int
             empty_folder_count += 1
             continue
             
-        if os.path.basename(path).lower().startswith("readme."):
+        if os.path.basename(path).casefold().startswith("readme."):
             readme_count += 1
             continue
             
@@ -149,62 +280,128 @@ def analyze_paths(paths: List[str]) -> Tuple[Dict[str, List[str]], int, int, int
             batch_count += 1
             final_batches[directory] = files
     
-    return final_batches, batch_count, single_file_count, empty_folder_count
+    return final_batches, batch_count, single_file_count, empty_folder_count, readme_count
 
-def show_spinner(duration: float):
-    """Show a spinner animation for the specified duration."""
+def show_spinner(duration: float, stop: Optional[threading.Event] = None):
+    """Show a spinner animation for the specified duration, or until stop is set."""
     chars = "⠋⠙⠹⠸⠼⠴⠦⠧⠇⠏"
     start_time = time.time()
     i = 0
-    while (time.time() - start_time) < duration:
+    while (time.time() - start_time) < duration and not (stop and stop.is_set()):
         print(f"\r{Fore.CYAN}{chars[i % len(chars)]} Processing...{Style.RESET_ALL}", end="", flush=True)
         i += 1
         time.sleep(0.1)
 
-def summarize_file(file_path: str, model: str = "gpt-3.5-turbo", max_tokens: int = 1200) -> Tuple[str, Dict]:
+def analyze_content(file_path: str, content: str) -> Dict:
+    """Run static analysis on a file, reusing the result while its content is unchanged."""
+    key = (file_path, hashlib.sha1(content.encode("utf-8")).hexdigest())
+    with analysis_lock:
+        results = analysis_cache.get(key)
+        if results is not None:
+            analysis_cache.move_to_end(key)
+            return results
+    
+    analyzer = getattr(analyzers, "analyzer", None)
+    if analyzer is None:
+        analyzer = analyzers.analyzer = CodeAnalyzer()
+    issues, stats = analyzer.analyze_file(file_path, content)
+    results = {
+        'stats': stats,
+        'issues': issues
+    }
+    
+    with analysis_lock:
+        analysis_cache[key] = results
+        if len(analysis_cache) > ANALYSIS_CACHE_SIZE:
+            analysis_cache.popitem(last=False)
+    return results
+
+def build_summary_messages(file_path: str) -> List[Dict]:
+    """Read and analyze a file and build the chat messages that request its summary."""
+    # Read file content
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    
+    # Analyze the code
+    analysis_results = analyze_content(file_path, content)
+    
+    # Generate the prompt with analysis results
+    prompt = generate_summary_prompt(file_path, content, analysis_results)
+    
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+def get_cached_summary(model: str, max_tokens: int, messages: List[Dict]) -> Optional[Tuple[str, Dict]]:
+    """Return the stored (summary, usage) for an identical earlier request, or None."""
+    if not summary_cache:
+        return None
+    cached = summary_cache.get(SummaryCache.make_key(model, max_tokens, messages))
+    if not cached:
+        return None
+    summary, usage = cached
+    return summary, {**usage, 'cached': True}
+
+def stream_summary(messages: List[Dict], model: str, max_tokens: int, file_path: str, summary_path: str) -> Tuple[str, Dict]:
     """
-    Generate a detailed summary of a code file.
+    Request a summary as a stream, writing it to summary_path as it arrives.
+    The caller rewrites the file through save_summary once the stream ends,
+    which adds the usage stats above the summary.
+    """
+    response = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=SUMMARY_TEMPERATURE,
+        max_tokens=max_tokens,
+        stream=True,
+        stream_options={"include_usage": True}
+    )
     
-    Args:
-        file_path: Path to the file to summarize
-        model: OpenAI model to use
-        max_tokens: Maximum tokens for the response
-        
-    Returns:
-        Tuple containing the summary and token usage statistics
+    parts = []
+    usage = None
+    with open(summary_path, "w", encoding="utf-8") as f:
+        write_summary_header(f, file_path)
+        f.write("## Summary\n\n")
+        for chunk in response:
+            # The usage arrives in a final chunk that has no choices
+            if chunk.usage:
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+                f.write(parts[-1])
+                f.flush()
+    
+    return "".join(parts), {
+        'prompt_tokens': usage.prompt_tokens if usage else 0,
+        'completion_tokens': usage.completion_tokens if usage else 0,
+        'total_tokens': usage.total_tokens if usage else 0
+    }
+
+def request_summary(messages: List[Dict], model: str, max_tokens: int, file_path: Optional[str] = None, summary_path: Optional[str] = None) -> Tuple[str, Dict]:
     """
-    try:
-        # Read file content
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        # Analyze the code
-        analyzer = CodeAnalyzer()
-        issues, stats = analyzer.analyze_file(file_path, content)
-        analysis_results = {
-            'stats': stats,
-            'issues': issues
-        }
-        
-        # Generate the prompt with analysis results
-        prompt = generate_summary_prompt(file_path, content, analysis_results)
-        
-        # Get summary from OpenAI
-        messages = [
-            {
-                "role": "system",
-                "content": "You are a technical documentation expert that creates detailed and accurate code summaries."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ]
-        
+    Get a summary from OpenAI, reusing the cached one for an unchanged request.
+    With summary_path, the summary of file_path is streamed into that file as it is generated.
+    """
+    # Unchanged files produce identical requests, so reuse the earlier summary
+    cached = get_cached_summary(model, max_tokens, messages)
+    if cached:
+        return cached
+    
+    rate_limiter.acquire(estimate_request_tokens(messages, max_tokens))
+    if summary_path:
+        summary, usage = stream_summary(messages, model, max_tokens, file_path, summary_path)
+    else:
         response = client.chat.completions.create(
             model=model,
             messages=messages,
-            temperature=0.5,
+            temperature=SUMMARY_TEMPERATURE,
             max_tokens=max_tokens
         )
         
@@ -214,40 +411,256 @@ def summarize_file(file_path: str, model: str = "gpt-3.5-turbo", max_tokens: int
             'completion_tokens': response.usage.completion_tokens,
             'total_tokens': response.usage.total_tokens
         }
+    
+    if summary_cache and summary:
+        summary_cache.set(SummaryCache.make_key(model, max_tokens, messages), summary, usage)
+    
+    return summary, usage
+
+def summarize_file(file_path: str, model: str = "gpt-3.5-turbo", max_tokens: Optional[int] = None, summary_path: Optional[str] = None) -> Tuple[str, Dict]:
+    """
+    Generate a detailed summary of a code file.
+    
+    Args:
+        file_path: Path to the file to summarize
+        model: OpenAI model to use
+        max_tokens: Maximum tokens for the response (sized from the file by default)
+        summary_path: File to stream the summary into while it is generated
         
-        return summary, usage
+    Returns:
+        Tuple containing the summary and token usage statistics
+    """
+    try:
+        messages = build_summary_messages(file_path)
+        return request_summary(messages, model, max_tokens or summary_max_tokens(file_path, model, messages), file_path, summary_path)
         
     except Exception as e:
         print(f"{Fore.RED}Error summarizing {file_path}: {str(e)}{Style.RESET_ALL}")
         return None, None
 
-def save_summary(output_dir: str, file_path: str, summary: str, success: bool, usage_stats: dict = None):
-    """Save the summary maintaining the original directory structure."""
+def estimate_tokens(size_bytes: int) -> int:
+    """
+    Roughly estimate the number of tokens in a file of the given size.
+    Assumes four bytes per token, which suits prose; dense code often runs
+    nearer three, so the estimate can fall short for code-heavy files.
+    """
+    return math.ceil(size_bytes * 0.25)
+
+def summary_max_tokens(file_path: str, model: str, messages: List[Dict]) -> int:
+    """
+    Size the completion limit from the file: about a third of its estimated
+    tokens, within bounds, and no more than the context has room for.
+    """
+    wanted = min(model_limits(model)["max_output"], max(SUMMARY_MIN_TOKENS, estimate_tokens(os.path.getsize(file_path)) // 3))
+    # With less room than a useful summary needs, ask for the minimum and
+    # let the API reject a prompt that really overflows, rather than
+    # accepting a truncated stub
+    return max(SUMMARY_MIN_TOKENS, min(wanted, context_room(model, messages)))
+
+def estimate_request_tokens(messages: List[Dict], max_tokens: int) -> int:
+    """Estimate the tokens a request counts against the rate limit: its prompt plus max_tokens."""
+    return estimate_tokens(sum(len(message["content"].encode("utf-8")) for message in messages)) + max_tokens
+
+def context_room(model: str, messages: List[Dict]) -> int:
+    """Estimate how many completion tokens fit in the model's context window after the prompt."""
+    # Code often tokenizes nearer 3 bytes per token than 4, so pad the estimate
+    prompt_tokens = math.ceil(estimate_request_tokens(messages, 0) * PROMPT_ESTIMATE_MARGIN)
+    return model_limits(model)["context"] - prompt_tokens
+
+def packing_limits(model: str) -> Tuple[int, int]:
+    """
+    Return (max_files, token_budget) for packing files sent to a model.
+    Packing needs JSON mode, and file contents get at most a third of the
+    context so the instructions and the summaries still fit.
+    """
+    limits = model_limits(model)
+    if not limits["json_mode"]:
+        return 1, PACK_TOKEN_BUDGET
+    return PACK_MAX_FILES, min(PACK_TOKEN_BUDGET, limits["context"] // 3)
+
+def pack_files(file_paths: List[str], max_files: int = PACK_MAX_FILES, token_budget: int = PACK_TOKEN_BUDGET) -> List[List[str]]:
+    """
+    Group small files so that each group can be summarized in one request.
+    Files too large to share a request are placed in a group of their own.
+    """
+    groups = []
+    current = []
+    current_tokens = 0
+    
+    for file_path in file_paths:
+        tokens = estimate_tokens(os.path.getsize(file_path))
+        if max_files <= 1 or tokens * 2 > token_budget:
+            groups.append([file_path])
+            continue
+        
+        if current and (len(current) >= max_files or current_tokens + tokens > token_budget):
+            groups.append(current)
+            current = []
+            current_tokens = 0
+        current.append(file_path)
+        current_tokens += tokens
+    
+    if current:
+        groups.append(current)
+    return groups
+
+def parse_packed_summaries(text: str) -> List:
+    """
+    Return the entries of a combined response's "summaries" array. If the
+    response was cut off, the entries written out in full are still returned.
+    """
     try:
-        # Get the source root directory (up to 'src')
-        src_index = file_path.lower().find('\\src\\')
-        if src_index == -1:
-            src_index = file_path.lower().find('/src/')
+        return json.loads(text).get("summaries", [])
+    except (json.JSONDecodeError, AttributeError):
+        pass
+    
+    key = text.find('"summaries"')
+    start = text.find("[", key) if key != -1 else -1
+    if start == -1:
+        return []
+    
+    # Decode one entry at a time until reaching the truncated one
+    decoder = json.JSONDecoder()
+    entries = []
+    pos = start + 1
+    while True:
+        while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+        try:
+            entry, pos = decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            break
+        entries.append(entry)
+    return entries
+
+def request_packed_summaries(requests: Dict[str, Tuple[List[Dict], int]], model: str) -> Dict[str, Tuple[str, Dict]]:
+    """
+    Summarize several files with a single chat completion. Takes the
+    (messages, max_tokens) each file would be requested with on its own.
+    Returns {file_path: (summary, usage)} for every file the response covered,
+    splitting the request's token usage evenly between them.
+    """
+    file_paths = list(requests)
+    prompt = PACKED_PROMPT.format(count=len(file_paths))
+    for i, file_path in enumerate(file_paths, 1):
+        prompt += f"\n\n===== File {i}: {file_path} =====\n{requests[file_path][0][-1]['content']}"
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    completion_tokens = min(
+        model_limits(model)["max_output"],
+        context_room(model, messages),
+        sum(max_tokens for _, max_tokens in requests.values())
+    )
+    if completion_tokens < SUMMARY_MIN_TOKENS:
+        # Too little room left for useful summaries; the files go out one by one
+        return {}
+    
+    rate_limiter.acquire(estimate_request_tokens(messages, completion_tokens))
+    response = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        temperature=SUMMARY_TEMPERATURE,
+        max_tokens=completion_tokens,
+        response_format={"type": "json_object"}
+    )
+    
+    entries = parse_packed_summaries(response.choices[0].message.content or "")
+    summaries = {entry.get("path"): entry.get("summary") for entry in entries if isinstance(entry, dict)}
+    covered = [file_path for file_path in file_paths if summaries.get(file_path)]
+    if not covered:
+        return {}
+    
+    count = len(covered)
+    totals = {
+        'prompt_tokens': response.usage.prompt_tokens,
+        'completion_tokens': response.usage.completion_tokens,
+        'total_tokens': response.usage.total_tokens
+    }
+    
+    results = {}
+    for i, file_path in enumerate(covered):
+        summary = summaries[file_path]
+        usage = {key: value // count + (1 if i < value % count else 0) for key, value in totals.items()}
+        results[file_path] = (summary, usage)
+        if summary_cache:
+            messages, max_tokens = requests[file_path]
+            summary_cache.set(SummaryCache.make_key(model, max_tokens, messages), summary, usage)
+    return results
+
+def summarize_group(file_paths: List[str], model: str = "gpt-3.5-turbo", max_tokens: Optional[int] = None) -> Dict[str, Tuple[str, Dict]]:
+    """
+    Summarize a group of small files, sharing one request between those not already cached.
+    Returns {file_path: (summary, usage)}, with (None, None) for files that failed.
+    """
+    results = {}
+    pending = {}
+    for file_path in file_paths:
+        try:
+            messages = build_summary_messages(file_path)
+            file_max_tokens = max_tokens or summary_max_tokens(file_path, model, messages)
+        except Exception as e:
+            print(f"{Fore.RED}Error summarizing {file_path}: {str(e)}{Style.RESET_ALL}")
+            results[file_path] = (None, None)
+            continue
         
-        if src_index != -1:
-            # Extract the path after 'src'
-            rel_path = file_path[src_index + 5:]  # +5 to skip '\src\'
+        cached = get_cached_summary(model, file_max_tokens, messages)
+        if cached:
+            results[file_path] = cached
         else:
-            # Fallback to using the full path structure
-            rel_path = file_path
-        
-        # Create the target directory structure
-        target_dir = os.path.join(output_dir, os.path.dirname(rel_path))
-        os.makedirs(target_dir, exist_ok=True)
-        
-        # Create the summary file with just .md extension
-        summary_path = os.path.join(target_dir, f"{os.path.basename(file_path)}.md")
+            pending[file_path] = (messages, file_max_tokens)
+    
+    if len(pending) > 1:
+        try:
+            results.update(request_packed_summaries(pending, model))
+        except Exception as e:
+            print(f"\n{Fore.YELLOW}Combined request failed, summarizing files individually: {str(e)}{Style.RESET_ALL}")
+    
+    # Anything the combined response missed gets a request of its own
+    for file_path, (messages, file_max_tokens) in pending.items():
+        if file_path in results:
+            continue
+        try:
+            results[file_path] = request_summary(messages, model, file_max_tokens)
+        except Exception as e:
+            print(f"{Fore.RED}Error summarizing {file_path}: {str(e)}{Style.RESET_ALL}")
+            results[file_path] = (None, None)
+    
+    return results
+
+def get_summary_path(output_dir: str, file_path: str) -> str:
+    """Return where a file's summary is saved, mirroring the original directory structure."""
+    path = PurePath(file_path)
+    parts = path.parts
+    try:
+        # Keep the structure below the source root directory ('src')
+        start = [part.casefold() for part in parts].index("src") + 1
+    except ValueError:
+        # Fallback to using the full path structure, minus any drive or root
+        start = 1 if path.anchor else 0
+    
+    # Create the target directory structure
+    target_dir = os.path.join(output_dir, *parts[start:-1])
+    os.makedirs(target_dir, exist_ok=True)
+    
+    # Create the summary file with just .md extension
+    return os.path.join(target_dir, f"{path.name}.md")
+
+def write_summary_header(f, file_path: str):
+    """Write the title and source lines that start every summary file."""
+    f.write(f"# Summary of {os.path.basename(file_path)}\n\n")
+    f.write(f"Source: `{file_path}`\n\n")
+
+def save_summary(output_dir: str, file_path: str, summary: str, success: bool, usage_stats: dict = None):
+    """Save the summary maintaining the original directory structure."""
+    try:
+        summary_path = get_summary_path(output_dir, file_path)
         
         print(f"\nSaving summary to: {summary_path}")  # Debug output
         
         with open(summary_path, "w", encoding="utf-8") as f:
-            f.write(f"# Summary of {os.path.basename(file_path)}\n\n")
-            f.write(f"Source: `{file_path}`\n\n")
+            write_summary_header(f, file_path)
             
             if success:
                 if usage_stats:
@@ -263,6 +676,72 @@ def save_summary(output_dir: str, file_path: str, summary: str, success: bool, u
     except Exception as e:
         print(f"\n{Fore.RED}Error saving summary for {file_path}: {str(e)}{Style.RESET_ALL}")
 
+def should_summarize(file_path: str) -> bool:
+    """Return True for existing files that should be summarized (README files are skipped)."""
+    return os.path.isfile(file_path) and not os.path.basename(file_path).casefold().startswith("readme.")
+
+def save_result(output_dir: str, file_path: str, summary: Optional[str], usage_stats: Optional[Dict]) -> Tuple[bool, int]:
+    """Save a summarize_file result. Returns (success, tokens_used)."""
+    success = summary is not None
+    save_summary(output_dir, file_path, summary, success, usage_stats)
+    # Cached summaries cost no tokens on this run
+    if not success or usage_stats.get('cached'):
+        return success, 0
+    return success, usage_stats.get('total_tokens', 0)
+
+def summarize_and_save(file_path: str, output_dir: str, model: str) -> Tuple[bool, int]:
+    """Summarize a single file and save the result. Returns (success, tokens_used)."""
+    # The summary is streamed into its file, then rewritten with the usage stats
+    summary, usage_stats = summarize_file(file_path, model, summary_path=get_summary_path(output_dir, file_path))
+    return save_result(output_dir, file_path, summary, usage_stats)
+
+def summarize_group_and_save(file_paths: List[str], output_dir: str, model: str) -> List[Tuple[str, bool, int]]:
+    """Summarize a group of files and save each result. Returns (file_path, success, tokens_used) per file."""
+    if len(file_paths) == 1:
+        return [(file_paths[0], *summarize_and_save(file_paths[0], output_dir, model))]
+    results = summarize_group(file_paths, model)
+    return [(file_path, *save_result(output_dir, file_path, *results[file_path])) for file_path in file_paths]
+
+def summarize_files(file_paths: List[str], output_dir: str, model: str, label: str = "") -> Tuple[int, int, int]:
+    """
+    Summarize files concurrently, saving each summary as soon as its request completes.
+    Returns (successful, failed, total_tokens)
+    """
+    successful = 0
+    failed = 0
+    total_tokens = 0
+    
+    if not file_paths:
+        return successful, failed, total_tokens
+    
+    # Small files share a request; each worker blocks on one OpenAI
+    # round-trip, so requests overlap
+    done = 0
+    with ThreadPoolExecutor(max_workers=SUMMARY_WORKERS) as executor:
+        groups = pack_files(file_paths, *packing_limits(model))
+        futures = {executor.submit(summarize_group_and_save, group, output_dir, model): group for group in groups}
+        for future in as_completed(futures):
+            group = futures[future]
+            done += len(group)
+            progress = (done / len(file_paths)) * 100
+            print(f"\r{Fore.CYAN}{label}Progress: {progress:.1f}%{Style.RESET_ALL} - Completed: {group[-1]}", end="", flush=True)
+            
+            try:
+                results = future.result()
+            except Exception as e:
+                print(f"\n{Fore.RED}Error processing {', '.join(group)}: {str(e)}{Style.RESET_ALL}")
+                failed += len(group)
+                continue
+            
+            for file_path, success, tokens in results:
+                if success:
+                    successful += 1
+                    total_tokens += tokens
+                else:
+                    failed += 1
+    
+    return successful, failed, total_tokens
+
 def process_batch(batch_files: List[str], output_dir: str, model: str, batch_num: int, total_batches: int, one_by_one: bool = False):
     """Process a batch of files."""
     total_files = len(batch_files)
@@ -275,37 +754,39 @@ def process_batch(batch_files: List[str], output_dir: str, model: str, batch_num
     # Create the output directory if it doesn't exist
     os.makedirs(output_dir, exist_ok=True)
     
-    for i, file_path in enumerate(batch_files, 1):
-        if os.path.isfile(file_path):
-            # Skip README files
-            if os.path.basename(file_path).lower().startswith("readme."):
-                continue
-            
-            if one_by_one:
+    if one_by_one:
+        # Each file waits for the user, so this mode stays sequential
+        for i, file_path in enumerate(batch_files, 1):
+            if should_summarize(file_path):
                 print(f"\nFile {i}/{total_files}: {file_path}")
                 user_input = input("Press Enter to process this file (or 'q' to quit batch): ").strip().lower()
                 if user_input == 'q':
                     print(f"{Fore.YELLOW}Skipping remaining files in batch.{Style.RESET_ALL}")
                     break
                 
-            progress = (i / total_files) * 100
-            print(f"\r{Fore.CYAN}[{batch_num}/{total_batches}] Progress: {progress:.1f}%{Style.RESET_ALL} - Processing: {file_path}", end="", flush=True)
-            
-            try:
-                summary, success, usage_stats = summarize_file(file_path, model)
-                if success:
-                    successful += 1
-                    total_tokens += usage_stats.get('total_tokens', 0)
-                else:
+                progress = (i / total_files) * 100
+                print(f"\r{Fore.CYAN}[{batch_num}/{total_batches}] Progress: {progress:.1f}%{Style.RESET_ALL} - Processing: {file_path}", end="", flush=True)
+                
+                # Spin while the request runs; the rate limiter handles pacing
+                stop_spinner = threading.Event()
+                spinner = threading.Thread(target=show_spinner, args=(float("inf"), stop_spinner), daemon=True)
+                spinner.start()
+                try:
+                    success, tokens = summarize_and_save(file_path, output_dir, model)
+                    if success:
+                        successful += 1
+                        total_tokens += tokens
+                    else:
+                        failed += 1
+                except Exception as e:
+                    print(f"\n{Fore.RED}Error processing {file_path}: {str(e)}{Style.RESET_ALL}")
                     failed += 1
-                    
-                save_summary(output_dir, file_path, summary, success, usage_stats)
-            except Exception as e:
-                print(f"\n{Fore.RED}Error processing {file_path}: {str(e)}{Style.RESET_ALL}")
-                failed += 1
-            
-            # Show a small spinner between API calls to avoid rate limits
-            show_spinner(0.5)
+                finally:
+                    stop_spinner.set()
+                    spinner.join()
+    else:
+        files = [file_path for file_path in batch_files if should_summarize(file_path)]
+        successful, failed, total_tokens = summarize_files(files, output_dir, model, f"[{batch_num}/{total_batches}] ")
     
     print(f"\n\nBatch {batch_num} Summary:")
     print(f"{Fore.GREEN}✓ Successful: {successful}{Style.RESET_ALL}")
@@ -318,52 +799,24 @@ def get_latest_output_file() -> str:
     output_dir = "output"
     if not os.path.exists(output_dir):
         return None
-        
-    files = [os.path.join(output_dir, f) for f in os.listdir(output_dir) 
-             if f.startswith("file_paths_") and f.endswith(".txt")]
+    
+    # scandir entries carry their name and cache their stat result
+    with os.scandir(output_dir) as entries:
+        files = [(entry.stat().st_ctime, entry.path) for entry in entries
+                 if entry.name.startswith("file_paths_") and entry.name.endswith(".txt")]
     
     if not files:
         return None
         
-    return max(files, key=os.path.getctime)
+    return max(files)[1]
 
 def process_all_files(batches: Dict[str, List[str]], output_dir: str, model: str) -> Tuple[int, int, int]:
     """Process all files without batch prompts."""
-    total_successful = 0
-    total_failed = 0
-    total_tokens = 0
-    total_files = sum(len(files) for files in batches.values())
-    processed = 0
+    file_paths = [file_path for files in batches.values() for file_path in files if should_summarize(file_path)]
     
-    print(f"\n{Fore.CYAN}Processing all files ({total_files} total)...{Style.RESET_ALL}")
+    print(f"\n{Fore.CYAN}Processing all files ({len(file_paths)} total, {SUMMARY_WORKERS} at a time)...{Style.RESET_ALL}")
     
-    for directory, files in batches.items():
-        print(f"\n{Fore.YELLOW}Processing directory: {directory}{Style.RESET_ALL}")
-        for file_path in files:
-            if os.path.isfile(file_path):
-                # Skip README files
-                if os.path.basename(file_path).lower().startswith("readme."):
-                    continue
-                
-                processed += 1
-                progress = (processed / total_files) * 100
-                print(f"\r{Fore.CYAN}Progress: {progress:.1f}%{Style.RESET_ALL} - Processing: {file_path}", end="", flush=True)
-                
-                try:
-                    summary, success, usage_stats = summarize_file(file_path, model)
-                    if success:
-                        total_successful += 1
-                        total_tokens += usage_stats.get('total_tokens', 0)
-                    else:
-                        total_failed += 1
-                        
-                    save_summary(output_dir, file_path, summary, success, usage_stats)
-                except Exception as e:
-                    print(f"\n{Fore.RED}Error processing {file_path}: {str(e)}{Style.RESET_ALL}")
-                    total_failed += 1
-                
-                # Show a small spinner between API calls to avoid rate limits
-                show_spinner(0.5)
+    total_successful, total_failed, total_tokens = summarize_files(file_paths, output_dir, model)
     
     print(f"\n\n{Fore.GREEN}Processing Complete!{Style.RESET_ALL}")
     print(f"✓ Successful: {total_successful}")
@@ -372,6 +825,111 @@ def process_all_files(batches: Dict[str, List[str]], output_dir: str, model: str
     
     return total_successful, total_failed, total_tokens
 
+def submit_batch_job(batches: Dict[str, List[str]], model: str, output_dir: str, max_tokens: Optional[int] = None) -> Tuple[int, int, int]:
+    """
+    Summarize all files through the OpenAI Batch API, which costs half as much
+    but may take up to 24 hours. Waits for the batch and saves each summary.
+    Returns (successful, failed, total_tokens)
+    """
+    successful = 0
+    failed = 0
+    total_tokens = 0
+    pending = {}
+    
+    # One request line per file; cached summaries are saved straight away.
+    # Files are read and analyzed on worker threads while earlier lines are
+    # written, and results are consumed in input order.
+    requests_path = os.path.join(output_dir, "batch_requests.jsonl")
+    file_paths = [file_path for files in batches.values() for file_path in files if should_summarize(file_path)]
+    with open(requests_path, "w", encoding="utf-8") as f, ThreadPoolExecutor(max_workers=SUMMARY_WORKERS) as executor:
+        prepared = [executor.submit(build_summary_messages, file_path) for file_path in file_paths]
+        for i, (file_path, future) in enumerate(zip(file_paths, prepared)):
+            try:
+                messages = future.result()
+                file_max_tokens = max_tokens or summary_max_tokens(file_path, model, messages)
+            except Exception as e:
+                print(f"{Fore.RED}Error summarizing {file_path}: {str(e)}{Style.RESET_ALL}")
+                failed += 1
+                continue
+            
+            cached = get_cached_summary(model, file_max_tokens, messages)
+            if cached:
+                save_result(output_dir, file_path, *cached)
+                successful += 1
+                continue
+            
+            custom_id = f"file-{i}"
+            pending[custom_id] = (file_path, messages, file_max_tokens)
+            f.write(json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": model,
+                    "messages": messages,
+                    "temperature": SUMMARY_TEMPERATURE,
+                    "max_tokens": file_max_tokens
+                }
+            }) + "\n")
+    
+    if not pending:
+        return successful, failed, total_tokens
+    
+    with open(requests_path, "rb") as f:
+        batch_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    print(f"\n{Fore.CYAN}Submitted batch {batch.id} with {len(pending)} files. Waiting for results...{Style.RESET_ALL}")
+    
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        time.sleep(BATCH_POLL_INTERVAL)
+        batch = client.batches.retrieve(batch.id)
+        counts = batch.request_counts
+        if counts:
+            print(f"\r{Fore.CYAN}Batch status: {batch.status} ({counts.completed}/{counts.total} done){Style.RESET_ALL}", end="", flush=True)
+    
+    if batch.status != "completed" or not batch.output_file_id:
+        print(f"\n{Fore.RED}Batch {batch.id} ended with status: {batch.status}{Style.RESET_ALL}")
+        return successful, failed + len(pending), total_tokens
+    
+    output = client.files.content(batch.output_file_id).text
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        file_path, messages, file_max_tokens = pending.pop(result.get("custom_id"), (None, None, None))
+        if file_path is None:
+            continue
+        
+        response = result.get("response") or {}
+        body = response.get("body") or {}
+        if response.get("status_code") != 200 or not body.get("choices"):
+            error = result.get("error") or body.get("error") or "No summary returned"
+            save_summary(output_dir, file_path, str(error), False)
+            failed += 1
+            continue
+        
+        summary = body["choices"][0]["message"]["content"]
+        usage = {key: body.get("usage", {}).get(key, 0) for key in ("prompt_tokens", "completion_tokens", "total_tokens")}
+        if summary_cache and summary:
+            summary_cache.set(SummaryCache.make_key(model, file_max_tokens, messages), summary, usage)
+        success, tokens = save_result(output_dir, file_path, summary, usage)
+        if success:
+            successful += 1
+            total_tokens += tokens
+        else:
+            failed += 1
+    
+    # Requests that errored are reported in the batch's error file, not the output
+    for file_path, _, _ in pending.values():
+        save_summary(output_dir, file_path, "Request failed in batch " + batch.id, False)
+    failed += len(pending)
+    
+    return successful, failed, total_tokens
+
 def generate_summary_prompt(file_path: str, content: str, analysis_results: Dict = None) -> str:
     """Generate a detailed prompt for the file summary."""
     prompt = f"""Analyze the following code file and provide a detailed summary.
@@ -471,7 +1029,7 @@ def main():
     try:
         print(f"\n{Fore.CYAN}Analyzing paths...{Style.RESET_ALL}")
         paths, file_stats = parse_text_paths(paths_file)
-        batches, batch_count, single_file_count, empty_folder_count = analyze_paths(paths)
+        batches, batch_count, single_file_count, empty_folder_count, readme_count = analyze_paths(paths)
         
         # Create output directory with timestamp inside summaries directory
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
@@ -490,7 +1048,7 @@ def main():
                 "batch_count": batch_count,
                 "single_file_count": single_file_count,
                 "empty_folder_count": empty_folder_count,
-                "readme_count": sum(1 for p in paths if os.path.basename(p).lower().startswith('readme.'))
+                "readme_count": readme_count
             }
         }
         with open(metadata_path, "w", encoding="utf-8") as f:
@@ -507,7 +1065,7 @@ def main():
         print(f"- Batches (multiple files): {batch_count}")
         print(f"- Single Files: {single_file_count}")
         print(f"- Empty Folders: {empty_folder_count}")
-        print(f"- README Files: {sum(1 for p in paths if os.path.basename(p).lower().startswith('readme.'))}")
+        print(f"- README Files: {readme_count}")
         
         if not batches:
             print(f"\n{Fore.YELLOW}No files found to summarize.{Style.RESET_ALL}")
@@ -517,12 +1075,13 @@ def main():
         print(f"\n{Fore.CYAN}Choose processing mode:{Style.RESET_ALL}")
         print("1. Process all files at once")
         print("2. Process files in batches (interactive)")
+        print("3. Submit all files to the Batch API (50% cheaper, results within 24 hours)")
         
         while True:
-            mode = input(f"\n{Fore.GREEN}Enter choice (1/2): {Style.RESET_ALL}").strip()
-            if mode in ['1', '2']:
+            mode = input(f"\n{Fore.GREEN}Enter choice (1/2/3): {Style.RESET_ALL}").strip()
+            if mode in ['1', '2', '3']:
                 break
-            print(f"{Fore.RED}Invalid choice. Please enter 1 or 2.{Style.RESET_ALL}")
+            print(f"{Fore.RED}Invalid choice. Please enter 1, 2 or 3.{Style.RESET_ALL}")
         
         # Process files according to chosen mode
         total_successful = 0
@@ -532,6 +1091,9 @@ def main():
         if mode == '1':
             # Process all files at once
             total_successful, total_failed, total_tokens_used = process_all_files(batches, output_dir, model)
+        elif mode == '3':
+            # Hand the whole job to the Batch API and wait for it
+            total_successful, total_failed, total_tokens_used = submit_batch_job(batches, model, output_dir)
         else:
             # Process in batches (interactive)
             print(f"\n{Fore.CYAN}Starting batch processing...{Style.RESET_ALL}")
@@ -556,10 +1118,6 @@ def main():
                 total_successful += successful
                 total_failed += failed
                 total_tokens_used += tokens
-                
-                if i < len(batches):
-                    print(f"\n{Fore.CYAN}Waiting before next batch...{Style.RESET_ALL}")
-                    show_spinner(2.0)
         
         # Update metadata with final statistics
         metadata["final_statistics"] = {
@@ -567,7 +1125,7 @@ def main():
             "successful": total_successful,
             "failed": total_failed,
             "total_tokens_used": total_tokens_used,
-            "processing_mode": "all_at_once" if mode == '1' else "batch_interactive"
+            "processing_mode": {'1': "all_at_once", '2': "batch_interactive", '3': "batch_api"}[mode]
         }
         with open(metadata_path, "w", encoding="utf-8") as f:
             json.dump(metadata, f, indent=2)
@@ -585,4 +1143,6 @@ def main():
         return
 
 if __name__ == "__main__":
+    # Initialize colorama
+    init()
     main() 
\ No newline at end of file
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 
+from colorama import init
 from src.summarizer.summarizer import main
 
 if __name__ == "__main__":
+    # Initialize colorama
+    init()
     main() 
\ No newline at end of file